@@ -0,0 +1,128 @@
+"""Generate rows builders for models."""
+
+from __future__ import annotations
+
+from inspect import getattr_static
+from typing import TYPE_CHECKING, Any, Callable, Optional  # py39
+
+from peewee import (
+    Field,
+    FieldAccessor,
+    FloatField,
+    ForeignKeyAccessor,
+    ForeignKeyField,
+    IntegerField,
+    Model,
+    ModelObjectCursorWrapper,
+    _StringField,  # type: ignore[]
+)
+
+from .cache import LRUCache
+
+if TYPE_CHECKING:
+    from peewee import BaseModelCursorWrapper
+
+# Converters which return values of these types as is
+ADAPTERS: dict[Any, str] = {
+    IntegerField.adapt: "int",
+    _StringField.adapt: "str",
+    FloatField.adapt: "float",
+    bool: "bool",
+}
+
+# Attributes which are set by fields accessors
+SETTERS = (FieldAccessor.__set__, ForeignKeyAccessor.__set__)
+
+# Instance attributes of models
+RESERVED = frozenset(("__data__", "__rel__", "_dirty"))
+
+BUILDERS: LRUCache[tuple, Optional[Callable]] = LRUCache(512)
+
+
+def get_builder(wrapper: BaseModelCursorWrapper) -> Optional[Callable]:
+    """Get a rows builder for the initialized cursor wrapper (None when it's not supported)."""
+    if type(wrapper) is not ModelObjectCursorWrapper:
+        return None
+
+    model = wrapper.constructor  # type: ignore[]
+    key = (model, tuple(wrapper.identifiers), tuple(wrapper.converters))  # type: ignore[]
+    builder = BUILDERS.get(key, False)
+    if builder is False:
+        builder = BUILDERS[key] = generate(model, wrapper.identifiers, wrapper.converters)  # type: ignore[]
+    return builder
+
+
+def generate(
+    model: Any, identifiers: list[str], converters: list[Optional[Callable]]
+) -> Optional[Callable]:
+    """Generate a function which builds model instances from rows.
+
+    Fields values are stored into `__data__` directly, other columns become instance attributes.
+    Converters are skipped for values which already have the target type.
+    """
+    if not (
+        isinstance(model, type)
+        and issubclass(model, Model)
+        and model.__init__ is Model.__init__
+        and model.__new__ is Model.__new__
+        and model.__setattr__ is Model.__setattr__
+    ):
+        return None
+
+    fields = model._meta.fields  # type: ignore[]
+    namespace: dict[str, Any] = {"new": model.__new__, "model": model}
+    data, attrs = [], []
+    for idx, (name, converter) in enumerate(zip(identifiers, converters, strict=True)):
+        value = f"v{idx}"
+        if converter is not None:
+            namespace[f"c{idx}"] = converter
+            adapter = get_adapter(converter)
+            value = (
+                f"c{idx}(v{idx})"
+                if adapter is None
+                else f"(v{idx} if v{idx} is None or v{idx}.__class__ is {adapter} "
+                f"else c{idx}(v{idx}))"
+            )
+
+        field = fields.get(name)
+        if field is not None:
+            accessor = getattr_static(model, name, None)
+            if getattr(type(accessor), "__set__", None) not in SETTERS:
+                return None
+            data.append(f"{name!r}: {value}")
+
+        elif name in RESERVED or hasattr(model, name):
+            return None
+
+        else:
+            attrs.append(f"{name!r}: {value}")
+
+    columns = ", ".join(f"v{idx}" for idx in range(len(identifiers)))
+    source = (
+        "def build(row):\n"
+        f"    {columns}, = row.values()\n"
+        "    obj = new(model)\n"
+        f"    obj.__dict__ = {{'__data__': {{{', '.join(data)}}}, '_dirty': set(), "
+        f"'__rel__': {{}}, {''.join(f'{attr}, ' for attr in attrs)}}}\n"
+        "    return obj\n"
+    )
+    exec(source, namespace)  # noqa: S102
+    return namespace["build"]
+
+
+def get_adapter(converter: Callable) -> Optional[str]:
+    """Get a type of the values which the converter returns as is."""
+    field = getattr(converter, "__self__", None)
+    if not isinstance(field, Field):
+        return None
+
+    func = getattr(converter, "__func__", None)
+    while isinstance(field, ForeignKeyField) and func is ForeignKeyField.python_value:
+        # Values from the database are not model instances
+        field = field.rel_field
+        func = type(field).python_value
+
+    if func is not Field.python_value:
+        return None
+
+    return ADAPTERS.get(type(field).adapt)
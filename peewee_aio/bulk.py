@@ -0,0 +1,126 @@
+"""Build bulk updates from lists of values."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Sequence  # py39
+
+from peewee import (
+    SCOPE_SOURCE,
+    SQL,
+    Cast,
+    Column,
+    CommaNodeList,  # type: ignore[]
+    Context,
+    Entity,
+    Field,
+    Model,
+    Node,
+    NodeList,
+    PostgresqlDatabase,
+    ValuesList,
+)
+
+if TYPE_CHECKING:
+    from peewee import ModelUpdate
+
+# Postgres serial types cannot be used in casts
+CAST_TYPES = {"SERIAL": "INTEGER", "BIGSERIAL": "BIGINT"}
+
+
+def update_from_values(
+    model_cls: type[Model], fields: Sequence[Field], rows: Sequence[Sequence[Any]], strategy: str
+) -> ModelUpdate | Context:
+    """Update the model's rows by joining a list of values.
+
+    Every row contains a primary key and the fields values. The "values" strategy uses
+    `UPDATE ... FROM (VALUES ...)` (Postgres, SQLite 3.33+), the "join" strategy joins a derived
+    table (MySQL).
+    """
+    meta = model_cls._meta  # type: ignore[]
+    pk = meta.primary_key
+    if not isinstance(pk, Field):
+        raise TypeError(f"{model_cls.__name__} has no primary key")
+
+    columns = [pk, *fields]
+    values = [
+        [field.to_value(value) for field, value in zip(columns, row, strict=True)] for row in rows
+    ]
+
+    database = meta.database
+    if isinstance(database, PostgresqlDatabase):
+        # Parameters in VALUES are untyped in Postgres
+        field_types = database._field_types  # type: ignore[]
+        types = []
+        for field in columns:
+            column_type = field_types.get(field.field_type, field.field_type)
+            types.append(CAST_TYPES.get(column_type, column_type))
+        values = [[Cast(value, tp) for value, tp in zip(row, types, strict=True)] for row in values]
+
+    if strategy == "join":
+        source = UnionValuesList(values, alias="v")
+        node = JoinedUpdate(
+            model_cls,
+            {field: Column(source, f"column{idx}") for idx, field in enumerate(fields, 2)},
+            source,
+            pk == Column(source, "column1"),
+        )
+        return database.get_sql_context().sql(node)
+
+    source = ValuesList(values, alias="v")
+    return (
+        model_cls.update(
+            {field: Column(source, f"column{idx}") for idx, field in enumerate(fields, 2)}
+        )
+        .from_(source)
+        .where(pk == Column(source, "column1"))
+    )
+
+
+class UnionValuesList(ValuesList):
+    """A derived table of values: `(SELECT ... UNION ALL SELECT ...)` (MySQL)."""
+
+    def __sql__(self, ctx: Context) -> Context:
+        if self._alias:  # type: ignore[]
+            ctx.alias_manager[self] = self._alias  # type: ignore[]
+
+        alias = ctx.alias_manager[self]
+        if ctx.scope != SCOPE_SOURCE:
+            return ctx.sql(Entity(alias))
+
+        selects = []
+        for num, row in enumerate(self._values):  # type: ignore[]
+            if num == 0:
+                row = [  # noqa: PLW2901
+                    NodeList((value, SQL("AS"), Entity(f"column{idx}")))
+                    for idx, value in enumerate(row, 1)
+                ]
+            selects.append(NodeList((SQL("SELECT"), CommaNodeList(row))))
+
+        ctx.sql(NodeList(selects, glue=" UNION ALL ", parens=True))
+        return ctx.literal(" AS ").sql(Entity(alias))
+
+
+class JoinedUpdate(Node):
+    """A multi-table update: `UPDATE table JOIN source ON ... SET ...` (MySQL)."""
+
+    def __init__(self, model_cls: type[Model], update: dict[Field, Node], source: Node, on: Node):
+        self.model_cls = model_cls
+        self.update = update
+        self.source = source
+        self.on = on
+
+    def __sql__(self, ctx: Context) -> Context:
+        ctx.literal("UPDATE ")
+        with ctx.scope_source():
+            ctx.sql(self.model_cls._meta.table)  # type: ignore[]
+            ctx.literal(" INNER JOIN ").sql(self.source)
+
+        with ctx.scope_normal():
+            ctx.literal(" ON ").sql(self.on).literal(" SET ")
+            ctx.sql(
+                CommaNodeList(
+                    [NodeList((field, SQL("="), value)) for field, value in self.update.items()]
+                )
+            )
+
+        return ctx
@@ -0,0 +1,328 @@
+"""Cache compiled SQL for repeated query shapes."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from inspect import isclass
+from typing import TYPE_CHECKING, Any, Callable, Generic, Hashable, Optional, TypeVar  # py39
+
+from peewee import BaseQuery, Context, Field, Model, Node, Value
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+TK = TypeVar("TK", bound=Hashable)
+TV = TypeVar("TV")
+
+SIMPLE_TYPES = (bool, int, float, str, bytes)
+
+# Query attributes which do not affect SQL
+SKIP_ATTRS = frozenset(("_hash", "_cursor_wrapper"))
+
+
+class LRUCache(OrderedDict, Generic[TK, TV]):
+    """A size-bounded mapping which evicts the least recently used items."""
+
+    def __init__(self, maxsize: int = 128):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key: TK, default: Any = None) -> Any:  # type: ignore[bad-override]
+        try:
+            self.move_to_end(key)
+        except KeyError:
+            return default
+        return super().__getitem__(key)
+
+    def __setitem__(self, key: TK, value: TV):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+class Uncacheable(Exception):  # noqa: N818
+    """The query shape cannot be cached."""
+
+
+class Marker:
+    """A placeholder for a query parameter."""
+
+    __slots__ = ("index",)
+
+    def __init__(self, index: int):
+        self.index = index
+
+    def __repr__(self):
+        return f"<Marker {self.index}>"
+
+
+class RecordingContext(Context):
+    """Record raw (not converted) parameter values."""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, **settings):
+        super().__init__(**settings)
+        self.raw: list[Any] = []
+
+    def value(self, value, converter=None, add_param=True):  # noqa: FBT002
+        if self.state.value_literals:
+            raise Uncacheable
+
+        self.raw.append(value)
+        return super().value(value, converter, add_param)
+
+
+class MarkerContext(Context):
+    """Compile a query with markers and build a parameters extraction plan."""
+
+    __slots__ = ("plan",)
+
+    def __init__(self, **settings):
+        super().__init__(**settings)
+        self.plan: list[tuple[int, Optional[Callable]]] = []
+
+    def value(self, value, converter=None, add_param=True):  # noqa: FBT002
+        if not isinstance(value, Marker):
+            if isinstance(value, Node) or isclass(value):
+                return super().value(value, converter, add_param)
+            raise Uncacheable
+
+        if not add_param or self.state.value_literals:
+            raise Uncacheable
+
+        if not converter:
+            converter = self.state.converter if converter is None else None
+
+        self.plan.append((value.index, converter))
+        self._values.append(value)  # type: ignore[]
+        return self.literal(self.state.param or "?")
+
+
+class Shape:
+    """Walk a query tree and collect its structure and leaf values."""
+
+    __slots__ = ("key", "leaves", "refs", "seen")
+
+    def __init__(self, query: BaseQuery):
+        self.key: list[Any] = []
+        self.leaves: list[Any] = []
+        self.refs: list[Field] = []
+        self.seen: set[int] = set()
+        self.walk(query)
+
+    def walk(self, obj: Any):  # noqa: C901
+        key = self.key
+        tp = type(obj)
+        if issubclass(tp, Node) and not issubclass(tp, Model):
+            if isinstance(obj, Field):
+                key.append(id(obj))
+                self.refs.append(obj)
+                return
+
+            # Protect from cycles (recursive CTE, etc)
+            seen = self.seen
+            if id(obj) in seen:
+                raise Uncacheable
+            seen.add(id(obj))
+
+            if isinstance(obj, Value):
+                key.append(Value)
+                key.append(obj.converter)
+                if obj.multi:
+                    key.append(len(obj.values))  # type: ignore[]
+                    for value in obj.values:  # type: ignore[]
+                        self.walk(value)
+                else:
+                    self.walk(obj.value)
+                return
+
+            key.append(type(obj))
+            for name, value in obj.__dict__.items():
+                if name not in SKIP_ATTRS:
+                    key.append(name)
+                    self.walk(value)
+            return
+
+        if tp is list or tp is tuple:
+            key.append(tp)
+            key.append(len(obj))
+            for value in obj:
+                self.walk(value)
+            return
+
+        if tp is dict:
+            key.append(tp)
+            key.append(len(obj))
+            for name, value in obj.items():
+                self.walk(name)
+                self.walk(value)
+            return
+
+        if isclass(obj):
+            key.append(obj)
+            return
+
+        self.leaves.append(obj)
+        key.append((tp, not obj) if tp in SIMPLE_TYPES else tp)
+
+    def clone(self, obj: Any, markers: dict[int, Marker], counter: list[int]) -> Any:  # noqa: PLR0911
+        """Clone the given tree replacing leaves with markers (follows the walk order)."""
+        tp = type(obj)
+        if issubclass(tp, Node) and not issubclass(tp, Model):
+            if isinstance(obj, Field):
+                return obj
+
+            new = obj.__class__.__new__(obj.__class__)
+            new.__dict__ = obj.__dict__.copy()
+            if isinstance(obj, Value):
+                if obj.multi:
+                    new.values = [self.clone(value, markers, counter) for value in obj.values]  # type: ignore[]
+                else:
+                    new.value = self.clone(obj.value, markers, counter)
+                return new
+
+            for name, value in obj.__dict__.items():
+                if name not in SKIP_ATTRS:
+                    new.__dict__[name] = self.clone(value, markers, counter)
+            return new
+
+        if tp is list or tp is tuple:
+            return tp(self.clone(value, markers, counter) for value in obj)
+
+        if tp is dict:
+            return {
+                self.clone(name, markers, counter): self.clone(value, markers, counter)
+                for name, value in obj.items()
+            }
+
+        if isclass(obj):
+            return obj
+
+        idx = counter[0]
+        counter[0] += 1
+        return markers.get(idx, obj)
+
+
+class CompiledSQL:
+    """A compiled SQL with a parameters extraction plan."""
+
+    __slots__ = ("effects", "fixed", "plan", "refs", "sql")
+
+    def __init__(
+        self,
+        sql: str,
+        plan: Sequence[tuple[int, Optional[Callable]]],
+        fixed: Sequence[tuple[int, Any]],
+        *,
+        effects: dict[str, Any],
+        refs: Sequence[Any],
+    ):
+        self.sql = sql
+        self.plan = plan
+        self.fixed = fixed
+        # Attributes which Peewee sets on queries while compiling
+        self.effects = effects
+        # Keep the fields alive, the cache keys use their ids
+        self.refs = refs
+
+    def params(self, leaves: Sequence[Any]) -> Optional[list[Any]]:
+        """Extract params from the given leaves. Return None if the leaves do not match."""
+        for idx, value in self.fixed:
+            leaf = leaves[idx]
+            if leaf is not value and leaf != value:
+                return None
+
+        params = []
+        for idx, converter in self.plan:
+            value = leaves[idx]
+            if converter is not None:
+                value = converter(value)
+                if isinstance(value, Node):
+                    return None
+            params.append(value)
+
+        return params
+
+
+class SQLCache:
+    """LRU cache of compiled SQL keyed by a query structure.
+
+    Queries with the same structure but different parameter values share the compiled SQL.
+    """
+
+    __slots__ = ("cache", "hits", "misses")
+
+    def __init__(self, maxsize: int = 256):
+        self.cache: LRUCache[tuple, Optional[CompiledSQL]] = LRUCache(maxsize)
+        self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def clear(self):
+        """Drop the cached SQL and reset the counters."""
+        self.cache.clear()
+        self.hits = self.misses = 0
+
+    def compile(self, query: BaseQuery) -> tuple[str, list[Any]]:
+        """Compile the given query using the cache."""
+        try:
+            shape = Shape(query)
+        except Uncacheable:
+            self.misses += 1
+            return query.sql()
+
+        key = tuple(shape.key)
+        compiled = self.cache.get(key, False)
+        if compiled:
+            params = compiled.params(shape.leaves)
+            if params is not None:
+                self.hits += 1
+                if compiled.effects:
+                    query.__dict__.update(compiled.effects)
+                return compiled.sql, params
+
+        self.misses += 1
+        if compiled is None:
+            return query.sql()
+
+        sql, params, compiled = self.build(query, shape)
+        self.cache[key] = compiled
+        return sql, params
+
+    def build(self, query: BaseQuery, shape: Shape) -> tuple[str, list[Any], Optional[CompiledSQL]]:
+        """Compile the given query and build a plan for the next calls."""
+        database = query._database  # type: ignore[]
+        options = database.get_context_options() if database else {}
+
+        # Peewee may update queries while compiling, keep the initial state
+        origin = shape.clone(query, {}, [0])
+        state = query.__dict__.copy()
+
+        ctx = RecordingContext(**options)
+        sql, params = ctx.parse(query)
+
+        effects = {
+            name: value for name, value in query.__dict__.items() if state.get(name) is not value
+        }
+        if any(value is not None and type(value) not in SIMPLE_TYPES for value in effects.values()):
+            return sql, params, None
+
+        try:
+            raw = {id(value) for value in ctx.raw}
+            markers = {idx: Marker(idx) for idx, leaf in enumerate(shape.leaves) if id(leaf) in raw}
+            mctx = MarkerContext(**options)
+            msql, mparams = mctx.parse(shape.clone(origin, markers, [0]))
+
+        # Any errors here mean that the query cannot be compiled with markers
+        except Exception:  # noqa: BLE001
+            return sql, params, None
+
+        if msql != sql or len(mparams) != len(params):
+            return sql, params, None
+
+        used = {idx for idx, _ in mctx.plan}
+        fixed = [(idx, leaf) for idx, leaf in enumerate(shape.leaves) if idx not in used]
+        return sql, params, CompiledSQL(sql, mctx.plan, fixed, effects=effects, refs=shape.refs)
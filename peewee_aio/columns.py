@@ -0,0 +1,87 @@
+"""Fetch results as columns."""
+
+from __future__ import annotations
+
+from array import array
+from typing import Any, Callable, Optional, Sequence  # py39
+
+from .builders import get_adapter
+
+try:
+    import numpy as np  # type: ignore[missing-import]
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+
+TYPES: dict[str, type] = {"int": int, "float": float, "bool": bool, "str": str}
+
+# Types of the values in columns which are stored into compact arrays
+ARRAYS: dict[frozenset, str] = {
+    frozenset((int,)): "q",
+    frozenset((float,)): "d",
+    frozenset((int, float)): "d",
+}
+
+
+def to_columns(
+    rows: Sequence[Any],
+    names: Sequence[str],
+    converters: Sequence[Optional[Callable]],
+    *,
+    numpy: bool = True,
+) -> dict[str, Sequence[Any]]:
+    """Transpose the rows into columns and convert every column with its converter.
+
+    Integer and float columns become `array.array` (lists for other values), NumPy arrays are
+    built when NumPy is installed (and `numpy` is enabled).
+    """
+    use_numpy = numpy and np is not None
+    res: dict[str, Sequence[Any]] = {}
+    for name, converter, values in zip(names, converters, zip(*rows, strict=True), strict=True):
+        column = convert_column(values, converter)
+        res[name] = to_numpy(column) if use_numpy else to_array(column)
+    return res
+
+
+def convert_column(values: tuple, converter: Optional[Callable]) -> Sequence[Any]:
+    """Convert the column's values (the converter is skipped when the values have its type)."""
+    if converter is None:
+        return values
+
+    adapter = get_adapter(converter)
+    if adapter is not None and set(map(type, values)) <= {TYPES[adapter], type(None)}:
+        return values
+
+    return list(map(converter, values))
+
+
+def to_array(column: Sequence[Any]) -> Sequence[Any]:
+    """Pack numbers into a compact array."""
+    typecode = ARRAYS.get(frozenset(map(type, column)))
+    if typecode is not None:
+        try:
+            return array(typecode, column)
+        except OverflowError:
+            pass
+
+    return list(column)
+
+
+def to_numpy(column: Sequence[Any]) -> Any:
+    """Build a NumPy array (objects arrays for the values without a native type)."""
+    if np is None:
+        raise RuntimeError("NumPy is not installed")
+
+    types = frozenset(map(type, column))
+    dtype: Any = object
+    if types == {bool}:
+        dtype = np.bool_
+    elif ARRAYS.get(types) == "d":
+        dtype = np.float64
+    elif types == {int}:
+        dtype = np.int64
+
+    try:
+        return np.fromiter(column, dtype=dtype, count=len(column))
+    except OverflowError:
+        return np.fromiter(column, dtype=object, count=len(column))
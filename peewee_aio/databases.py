@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import sqlite3
 from typing import TYPE_CHECKING
 
 import peewee as pw
@@ -12,6 +13,12 @@ if TYPE_CHECKING:
 class Database(pw.Database):
     enabled: bool = False
 
+    # The maximum number of bind parameters in a query
+    param_limit: int = 999
+
+    # The default bulk update strategy: "values", "join" or "case"
+    update_strategy: str = "case"
+
     def execute(self, *args, **kwargs):
         if not self.enabled:
             raise RuntimeError(
@@ -22,15 +29,18 @@ class Database(pw.Database):
 
 
 class SqliteDatabase(Database, pw.SqliteDatabase):
-    pass
+    param_limit = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+    update_strategy = "values" if sqlite3.sqlite_version_info >= (3, 33, 0) else "case"
 
 
 class MySQLDatabase(Database, pw.MySQLDatabase):
-    pass
+    param_limit = 65535
+    update_strategy = "join"
 
 
 class PostgresqlDatabase(Database, pw.PostgresqlDatabase):
-    pass
+    param_limit = 32767
+    update_strategy = "values"
 
 
 _backend_to_db: dict[str, type[Database]] = {
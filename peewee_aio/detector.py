@@ -0,0 +1,118 @@
+"""Detect N+1 queries."""
+
+from __future__ import annotations
+
+import sys
+import warnings
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Optional  # py39
+
+if TYPE_CHECKING:
+    from peewee import ForeignKeyField
+
+    from .events import QueryEvent
+    from .model import AIOModelSelect
+
+# Queries which are repeated in loops
+METHODS = frozenset(("fetchall", "fetchmany", "fetchone", "fetchval", "iterate", "stream"))
+
+# Frames of these modules are skipped when looking for a call site
+SKIP_MODULES = ("peewee", "playhouse", "asyncio", "trio", "contextlib", "aio_databases")
+
+
+class NPlusOneWarning(UserWarning):
+    """A N+1 queries pattern is detected."""
+
+
+class NPlusOneError(AssertionError):
+    """A N+1 queries pattern is detected (raised in strict mode)."""
+
+
+class Report:
+    """A detected N+1 pattern."""
+
+    __slots__ = ("count", "filename", "kind", "lineno", "name")
+
+    def __init__(self, kind: str, name: str, count: int, filename: str, lineno: int):
+        self.kind = kind
+        self.name = name
+        self.count = count
+        self.filename = filename
+        self.lineno = lineno
+
+    def __str__(self):
+        if self.kind == "relation":
+            return (
+                f"N+1 queries: {self.name} is loaded one by one {self.count} times "
+                f"at {self.filename}:{self.lineno}. "
+                "Use a join, prefetch() or manager.batch_relations()."
+            )
+
+        return (
+            f"N+1 queries: the query is repeated {self.count} times "
+            f"at {self.filename}:{self.lineno}: {self.name}"
+        )
+
+    def __repr__(self):
+        return f"<Report {self.kind} {self.name!r} {self.filename}:{self.lineno}>"
+
+
+class NPlusOneDetector:
+    """Count lazy foreign key loads and repeated queries in the current context.
+
+    A pattern is reported (once) when the number of the repetitions reaches the threshold.
+    """
+
+    __slots__ = ("counts", "error", "reports", "threshold")
+
+    def __init__(self, threshold: int = 5, *, error: bool = False):
+        self.threshold = threshold
+        self.error = error
+        self.counts: dict[tuple[str, str], int] = {}
+        self.reports: list[Report] = []
+
+    async def load(self, field: ForeignKeyField, query: AIOModelSelect) -> Any:
+        """Load a related instance lazily."""
+        self.count("relation", f"{field.model.__name__}.{field.name}")
+        token = loading.set(True)
+        try:
+            return await query.get()
+        finally:
+            loading.reset(token)
+
+    def query(self, event: QueryEvent):
+        """A query hook."""
+        if event.method in METHODS and event.error is None and not loading.get():
+            self.count("query", event.fingerprint)
+
+    def count(self, kind: str, name: str):
+        key = (kind, name)
+        count = self.counts[key] = self.counts.get(key, 0) + 1
+        if count != self.threshold:
+            return
+
+        filename, lineno = call_site()
+        report = Report(kind, name, count, filename, lineno)
+        self.reports.append(report)
+        if self.error:
+            raise NPlusOneError(str(report))
+
+        warnings.warn_explicit(str(report), NPlusOneWarning, filename, lineno)
+
+
+def call_site() -> tuple[str, int]:
+    """Find the first frame outside of the libraries."""
+    frame = sys._getframe(1)
+    while frame.f_back is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(SKIP_MODULES):
+            break
+        frame = frame.f_back
+
+    return frame.f_code.co_filename, frame.f_lineno
+
+
+current_detector: ContextVar[Optional[NPlusOneDetector]] = ContextVar(
+    "current_detector", default=None
+)
+loading: ContextVar[bool] = ContextVar("loading", default=False)
@@ -0,0 +1,235 @@
+"""Stream rows by batches from server-side cursors."""
+
+from __future__ import annotations
+
+from contextlib import aclosing, suppress
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    Callable,
+    Iterable,
+    Optional,
+    Sequence,
+)  # py39
+from uuid import uuid4
+
+from aio_databases.record import Record
+
+if TYPE_CHECKING:
+    from aio_databases.backends import ABCConnection
+
+# Connections which are reading unbuffered results (MySQL)
+STREAMING: set[ABCConnection] = set()
+
+
+async def fetch_batches(
+    conn: ABCConnection, sql: str, params: Any, batch_size: int
+) -> AsyncGenerator[list[Any], None]:
+    """Fetch the given SQL by batches using the connection's driver."""
+    check_streaming(conn)
+    backend = conn.backend
+    sql = backend.__convert_sql__(sql)
+    conn.logger.debug((sql, *params))
+    driver = DRIVERS.get(backend.name.split("+")[0], stream_dbapi)
+    async with aclosing(driver(conn, sql, params, batch_size)) as batches:
+        async for rows in batches:
+            yield rows
+
+
+def check_streaming(conn: Optional[ABCConnection]):
+    """Fail instead of waiting for a connection which is reading unbuffered results."""
+    if conn is not None and conn in STREAMING:
+        raise RuntimeError(
+            "The connection is streaming results (MySQL unbuffered cursor), "
+            "open another connection for queries inside the loop (manager.connection())"
+        )
+
+
+async def stream_asyncpg(
+    conn: ABCConnection, sql: str, params: Any, batch_size: int
+) -> AsyncGenerator[list[Any], None]:
+    """Use a cursor inside a transaction (asyncpg requires it for cursors)."""
+    raw: Any = conn._conn
+    lock = conn._lock
+    trans = raw.transaction()
+    async with lock:
+        await trans.start()
+
+    failed = False
+    try:
+        async with lock:
+            cursor = await raw.cursor(sql, *params)
+
+        while True:
+            async with lock:
+                rows = await cursor.fetch(batch_size)
+
+            if rows:
+                yield rows
+
+            if len(rows) < batch_size:
+                break
+
+    except Exception:
+        failed = True
+        raise
+
+    finally:
+        # The cursor is closed with the transaction (a savepoint inside transactions)
+        async with lock:
+            if failed:
+                # Keep the original error
+                with suppress(Exception):
+                    await trans.rollback()
+            else:
+                await trans.commit()
+
+
+async def stream_aiopg(
+    conn: ABCConnection, sql: str, params: Any, batch_size: int
+) -> AsyncGenerator[list[Any], None]:
+    """Declare a named cursor (aiopg does not support psycopg2 named cursors)."""
+    raw: Any = conn._conn
+    lock = conn._lock
+    name = f"aiopg_{uuid4().hex}"
+    begin = not conn.transactions
+    async with raw.cursor() as cursor:
+        async with lock:
+            if begin:
+                await cursor.execute("BEGIN")
+            await cursor.execute(f"DECLARE {name} NO SCROLL CURSOR FOR {sql}", params)
+
+        failed = False
+        try:
+            while True:
+                async with lock:
+                    await cursor.execute(f"FETCH FORWARD {batch_size:d} FROM {name}")
+                    rows = await cursor.fetchall()
+                    desc = cursor.description
+
+                if rows:
+                    yield [Record(row, desc) for row in rows]
+
+                if len(rows) < batch_size:
+                    break
+
+        except Exception:
+            failed = True
+            raise
+
+        finally:
+            async with lock:
+                if not failed:
+                    await cursor.execute(f"CLOSE {name}")
+                    if begin:
+                        await cursor.execute("COMMIT")
+
+                # The transaction is aborted, the cursor is closed with it (keep the error)
+                elif begin:
+                    with suppress(Exception):
+                        await cursor.execute("ROLLBACK")
+
+
+async def stream_mysql(
+    conn: ABCConnection, sql: str, params: Any, batch_size: int
+) -> AsyncGenerator[list[Any], None]:
+    """Use an unbuffered cursor.
+
+    The connection is locked until the results are read: queries on the same connection inside
+    the loop raise RuntimeError (run them on another connection).
+    """
+    raw: Any = conn._conn
+    if conn.backend.name == "trio-mysql":
+        from trio_mysql.cursors import SSCursor  # noqa: PLC0415
+    else:
+        from aiomysql import SSCursor  # noqa: PLC0415
+
+    async with conn._lock, raw.cursor(SSCursor) as cursor:
+        STREAMING.add(conn)
+        try:
+            await cursor.execute(sql, params)
+            desc = cursor.description
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if rows:
+                    yield [Record(row, desc) for row in rows]
+
+                if len(rows) < batch_size:
+                    break
+
+        finally:
+            STREAMING.discard(conn)
+
+
+async def stream_dbapi(
+    conn: ABCConnection, sql: str, params: Any, batch_size: int
+) -> AsyncGenerator[list[Any], None]:
+    """Use `fetchmany` (SQLite cursors step through the results)."""
+    raw: Any = conn._conn
+    lock = conn._lock
+    async with raw.cursor() as cursor:
+        async with lock:
+            await cursor.execute(sql, params)
+            desc = cursor.description
+
+        while True:
+            async with lock:
+                rows = await cursor.fetchmany(batch_size)
+
+            if rows:
+                yield [Record(row, desc) for row in rows]
+
+            if len(rows) < batch_size:
+                break
+
+
+async def copy_records_asyncpg(
+    conn: ABCConnection,
+    table: str,
+    records: Iterable[Sequence[Any]],
+    *,
+    columns: Sequence[str],
+    schema: Optional[str] = None,
+) -> int:
+    """Copy the records into the table with the binary COPY protocol."""
+    raw: Any = conn._conn
+    conn.logger.debug(("COPY", table, *columns))
+    async with conn._lock:
+        status = await raw.copy_records_to_table(
+            table, records=records, columns=columns, schema_name=schema
+        )
+    return parse_copy_status(status)
+
+
+async def copy_from_query_asyncpg(
+    conn: ABCConnection,
+    sql: str,
+    params: Any,
+    *,
+    output: Any,
+    format: str,  # noqa: A002
+) -> int:
+    """Copy the query results into the output."""
+    raw: Any = conn._conn
+    sql = conn.backend.__convert_sql__(sql)
+    conn.logger.debug(("COPY", sql, *params))
+    async with conn._lock:
+        status = await raw.copy_from_query(sql, *params, output=output, format=format)
+    return parse_copy_status(status)
+
+
+def parse_copy_status(status: str) -> int:
+    """Parse the number of rows from a COPY status."""
+    _, _, rows = status.rpartition(" ")
+    return int(rows) if rows.isdigit() else 0
+
+
+ASYNCPG = frozenset(("asyncpg", "asyncpg+pool"))
+
+DRIVERS: dict[str, Callable[..., AsyncGenerator[list[Any], None]]] = {
+    "asyncpg": stream_asyncpg,
+    "aiopg": stream_aiopg,
+    "aiomysql": stream_mysql,
+    "trio-mysql": stream_mysql,
+}
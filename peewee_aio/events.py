@@ -0,0 +1,222 @@
+"""Report queries timings to hooks and aggregate them."""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from hashlib import blake2b
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence  # py39
+
+from aio_databases.database import Database
+from peewee import logger  # type: ignore[]
+
+from .utils import spawn
+
+if TYPE_CHECKING:
+    from .manager import Manager
+
+# A list of parameters: (?, ?, ?) or (%s, %s)
+PARAMS_RE = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+# Repeated lists of parameters (multi-row VALUES)
+GROUPS_RE = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+SPACES_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """Normalize the SQL to group queries which differ in the number of parameters only."""
+    sql = SPACES_RE.sub(" ", sql.strip())
+    sql = PARAMS_RE.sub("(...)", sql)
+    return GROUPS_RE.sub("(...)", sql)
+
+
+def digest(params: Sequence[Any]) -> str:
+    """Get a short digest of the parameters (values are not exposed)."""
+    return blake2b(repr(tuple(params)).encode(), digest_size=8).hexdigest()
+
+
+class QueryEvent:
+    """Timings of a query (in seconds).
+
+    - `compile_time`: SQL compilation
+    - `wait_time`: waiting for a connection
+    - `execute_time`: running the query in the driver
+    - `build_time`: building the results (models, dicts, tuples)
+    """
+
+    __slots__ = (
+        "build_time",
+        "compile_time",
+        "error",
+        "execute_time",
+        "hooks",
+        "method",
+        "params",
+        "rows",
+        "sql",
+        "wait_time",
+    )
+
+    def __init__(self, method: str, hooks: Sequence[Callable[[QueryEvent], Any]]):
+        self.method = method
+        self.hooks = hooks
+        self.sql: str = ""
+        self.params: Sequence[Any] = ()
+        self.rows: Optional[int] = None
+        self.error: Optional[Exception] = None
+        self.compile_time = self.wait_time = self.execute_time = self.build_time = 0.0
+
+    def __repr__(self):
+        return f"<QueryEvent {self.method} {self.total:.6f}s {self.sql!r}>"
+
+    @property
+    def total(self) -> float:
+        return self.compile_time + self.wait_time + self.execute_time + self.build_time
+
+    @property
+    def fingerprint(self) -> str:
+        return fingerprint(self.sql)
+
+    @property
+    def digest(self) -> str:
+        return digest(self.params)
+
+    def emit(self):
+        """Report the event to the hooks.
+
+        Errors in the hooks are logged and do not break queries, assertions are raised (tests).
+        """
+        for hook in self.hooks:
+            try:
+                hook(self)
+            except AssertionError:  # noqa: PERF203
+                raise
+            except Exception:  # noqa: BLE001
+                logger.exception("Query hook failed: %r", hook)
+
+
+class QueryStat:
+    """Aggregated statistics of a query fingerprint."""
+
+    __slots__ = (
+        "build_time",
+        "compile_time",
+        "count",
+        "errors",
+        "execute_time",
+        "fingerprint",
+        "max_time",
+        "rows",
+        "total_time",
+        "wait_time",
+    )
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.count = self.errors = self.rows = 0
+        self.total_time = self.max_time = 0.0
+        self.compile_time = self.wait_time = self.execute_time = self.build_time = 0.0
+
+    def __repr__(self):
+        return f"<QueryStat {self.count} {self.total_time:.6f}s {self.fingerprint!r}>"
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.count if self.count else 0.0
+
+    def add(self, event: QueryEvent):
+        total = event.total
+        self.count += 1
+        self.errors += event.error is not None
+        self.rows += event.rows or 0
+        self.total_time += total
+        self.max_time = max(self.max_time, total)
+        self.compile_time += event.compile_time
+        self.wait_time += event.wait_time
+        self.execute_time += event.execute_time
+        self.build_time += event.build_time
+
+
+class QueryStats:
+    """A query hook which groups the statistics by query fingerprints."""
+
+    __slots__ = ("stats",)
+
+    def __init__(self):
+        self.stats: dict[str, QueryStat] = {}
+
+    def __call__(self, event: QueryEvent):
+        key = event.fingerprint
+        stat = self.stats.get(key)
+        if stat is None:
+            stat = self.stats[key] = QueryStat(key)
+        stat.add(event)
+
+    def __len__(self) -> int:
+        return len(self.stats)
+
+    def top(self, n: int = 10, *, by: str = "total_time") -> list[QueryStat]:
+        """Get the hottest queries."""
+        return sorted(self.stats.values(), key=lambda stat: getattr(stat, by), reverse=True)[:n]
+
+    def clear(self):
+        self.stats.clear()
+
+
+class SlowQueryLog:
+    """A query hook which logs queries slower than the threshold (in seconds).
+
+    With `explain=True` plans of slow SELECT queries are captured in background (on a separate
+    connection) and logged together with the queries.
+    """
+
+    __slots__ = ("count", "explain", "manager", "threshold")
+
+    def __init__(self, manager: Manager, threshold: float, *, explain: bool = False):
+        self.manager = manager
+        self.threshold = threshold
+        self.explain = explain
+        self.count = 0
+
+    def __call__(self, event: QueryEvent):
+        if event.total < self.threshold:
+            return
+
+        self.count += 1
+        if self.explain and event.sql.lstrip()[:6].upper() in {"SELECT", "WITH"}:
+            spawn(self.log_plan, event)
+        else:
+            self.log(event)
+
+    def log(self, event: QueryEvent, plan: Optional[str] = None):
+        msg = "Slow query (%.3fs, params %s): %s"
+        args: tuple = (event.total, event.digest, event.sql)
+        if plan is not None:
+            msg += "\nPlan:\n%s"
+            args = (*args, plan)
+
+        logger.warning(
+            msg,
+            *args,
+            extra={"sql": event.sql, "params_digest": event.digest, "duration": event.total},
+        )
+
+    async def log_plan(self, event: QueryEvent):
+        try:
+            plan = await self.get_plan(event.sql, event.params)
+        except Exception:  # noqa: BLE001
+            logger.debug("Failed to explain the query: %s", event.sql, exc_info=True)
+            plan = None
+
+        self.log(event, plan)
+
+    async def get_plan(self, sql: str, params: Sequence[Any]) -> str:
+        """Explain the given SQL on a separate connection."""
+        manager = self.manager
+        prefix = "EXPLAIN QUERY PLAN" if manager.backend.db_type == "sqlite" else "EXPLAIN"
+        # In-memory SQLite databases are separate per connection
+        async with manager.connection(create=not manager.in_memory):
+            # Hooks are skipped here
+            rows = await Database.fetchall(manager, f"{prefix} {sql}", *params)
+
+        return "\n".join(" | ".join(str(value) for value in row.values()) for row in rows)
@@ -14,6 +14,9 @@ if TYPE_CHECKING:
 
     from .model import AIOModel
 
+from .detector import current_detector
+from .loader import current_loader
+from .session import current_session
 from .types import TV, TVAIOModel
 
 
@@ -83,6 +86,13 @@ class TPWNode:  # noqa: PLW1641
 
 
 class GenericField(TPWNode, Generic[TV]):
+    deferred: bool = False
+
+    def __init__(self, *args, deferred: bool = False, **kwargs):
+        """Deferred fields are not selected by default, load them with `AIOModel.load`."""
+        super().__init__(*args, **kwargs)
+        self.deferred = deferred
+
     if TYPE_CHECKING:
         # Descriptor methods
         # ------------------
@@ -392,9 +402,25 @@ class AIOForeignKeyAccessor(pw.ForeignKeyAccessor):
 
         field = self.field
         if field.lazy_load:
-            rel_instance = await self.rel_model.get(field.rel_field == value)
+            session = current_session.get()
+            if session is not None and field.rel_field is self.rel_model._meta.primary_key:
+                rel_instance = session.get(self.rel_model, value)
+                if rel_instance is not None:
+                    relations[name] = rel_instance
+                    return rel_instance  # type: ignore[]
+
+            loader = current_loader.get()
+            detector = current_detector.get()
+            if loader is None and detector is not None:
+                rel_instance = await detector.load(
+                    field, self.rel_model.select().where(field.rel_field == value)
+                )
+            elif loader is None:
+                rel_instance = await self.rel_model.get(field.rel_field == value)
+            else:
+                rel_instance = await loader.load(field, value)
             relations[name] = rel_instance
-            return rel_instance
+            return rel_instance  # type: ignore[]
 
         return value
 
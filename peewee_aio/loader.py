@@ -0,0 +1,101 @@
+"""Batch foreign key lookups."""
+
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, Sequence  # py39
+
+from .utils import checkpoint, create_event
+
+if TYPE_CHECKING:
+    from peewee import Field, ForeignKeyField, Model
+
+    from .model import AIOModel
+
+
+class Batch:
+    """Values which are loaded with a single query."""
+
+    __slots__ = ("done", "error", "finished", "values")
+
+    def __init__(self):
+        self.values: list[Any] = []
+        self.done = create_event()
+        self.error: Optional[BaseException] = None
+        self.finished = False
+
+
+class RelationsLoader:
+    """Gather concurrent foreign key lookups and deferred fields loads into `IN` queries.
+
+    Loaded instances are cached for the loader's lifetime.
+    """
+
+    __slots__ = ("batches", "cache")
+
+    def __init__(self):
+        self.cache: dict[tuple[type[Model], Field], dict[Any, Model]] = {}
+        self.batches: dict[tuple, Batch] = {}
+
+    async def load(self, field: ForeignKeyField, value: Any) -> Model:
+        """Load a related instance by the given foreign key value."""
+        rel_model, rel_field = field.rel_model, field.rel_field
+        key = (rel_model, rel_field)
+        loaded = self.cache.setdefault(key, {})
+        if value in loaded:
+            return loaded[value]
+
+        async def run(values: list[Any]):
+            missing = set(values) - loaded.keys()
+            if missing:
+                async for instance in rel_model.select().where(rel_field.in_(missing)):
+                    loaded[instance.__data__[rel_field.name]] = instance
+
+        await self.gather(key, value, run)
+        if value not in loaded:
+            raise rel_model.DoesNotExist
+
+        return loaded[value]
+
+    async def load_fields(self, instance: AIOModel, fields: Sequence[Field]):
+        """Load fields of the given instance (the instances are loaded together)."""
+        model = type(instance)
+
+        async def run(instances: list[AIOModel]):
+            await model.bulk_load(instances, *fields)
+
+        await self.gather((model, *fields), instance, run)
+
+    async def gather(self, key: tuple, value: Any, run: Callable[[list[Any]], Awaitable[Any]]):
+        """Add the value to a batch, the first caller runs the batch for all the values."""
+        while (batch := self.batches.get(key)) is not None:
+            batch.values.append(value)
+            await batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+            if batch.finished:
+                return
+
+            # The first caller has been cancelled, retry with another batch
+
+        batch = self.batches[key] = Batch()
+        batch.values.append(value)
+        try:
+            # Let concurrent tasks join the batch
+            await checkpoint()
+            del self.batches[key]
+
+            await run(batch.values)
+            batch.finished = True
+
+        except Exception as exc:
+            batch.error = exc
+            raise
+
+        finally:
+            if self.batches.get(key) is batch:
+                del self.batches[key]
+            batch.done.set()
+
+
+current_loader: ContextVar[Optional[RelationsLoader]] = ContextVar("current_loader", default=None)
@@ -1,33 +1,45 @@
 from __future__ import annotations
 
-from contextlib import contextmanager, suppress
+import csv
+from contextlib import ExitStack, aclosing, asynccontextmanager, contextmanager, suppress
 from functools import cached_property
+from inspect import isclass, iscoroutinefunction
+from io import StringIO
+from os import PathLike
+from random import choice, random
+from time import perf_counter
 from typing import (  # py39
     TYPE_CHECKING,
     Any,
     AsyncIterator,
+    Awaitable,
     Callable,
+    ClassVar,
     Coroutine,
     Generator,
+    Iterable,
     Iterator,
     Mapping,
     Optional,
     Sequence,
+    TypeVar,
     Union,
     overload,
 )
 from weakref import WeakSet
 
 import peewee as pw
-from aio_databases.database import Database
+from aio_databases.database import ConnectionContext, Database, TransactionContext
 from peewee import (
     PREFETCH_TYPE,
     SQL,
     BaseQuery,
     Context,
+    Field,
     Insert,
     IntegrityError,
     InternalError,
+    Join,
     ModelRaw,
     ModelSelect,
     Node,
@@ -36,27 +48,97 @@ from peewee import (
     SchemaManager,
     Select,
     __exception_wrapper__,  # type: ignore[]
+    _WriteQuery,  # type: ignore[]
+    chunked,
     fn,
     sort_models,  # type: ignore[]
 )
 from peewee import Model as PWModel
 
+from .builders import get_builder
+from .cache import LRUCache, SQLCache
+from .columns import to_columns
 from .databases import Database as PWDatabase
 from .databases import get_db
+from .detector import NPlusOneDetector, current_detector
+from .drivers import (
+    ASYNCPG,
+    check_streaming,
+    copy_from_query_asyncpg,
+    copy_records_asyncpg,
+    fetch_batches,
+)
+from .events import QueryEvent, SlowQueryLog
+from .loader import RelationsLoader, current_loader
 from .model import AIOModel
+from .replicas import PRIMARY, ReplicaRouter, ReplicaState
+from .results import (
+    CACHED_METHODS,
+    ResultCache,
+    cache_key,
+    dump_result,
+    load_result,
+    query_tags,
+    table_tag,
+)
+from .session import Session, current_session
+from .utils import create_event, gather, spawn, wait_event
 
 if TYPE_CHECKING:
+    from contextlib import AbstractAsyncContextManager
+
+    from aio_databases.backends import ABCConnection
+
     from .types import TVModel
 
+TVHook = TypeVar("TVHook", bound=Callable[[QueryEvent], Any])
+
+# Drivers' default pools size
+DEFAULT_POOL_SIZE = 10
+
 
 class Manager(Database):
     """Manage database and models."""
 
     pw_database: PWDatabase
     models: "WeakSet[type[PWModel]]"
-
-    def __init__(self, url: str, **backend_options):
-        """Initialize dialect and database."""
+    sql_cache: Optional[SQLCache] = None
+    result_cache: Optional[ResultCache] = None
+    query_hooks: list[Callable[[QueryEvent], Any]]
+    slow_queries: Optional[SlowQueryLog] = None
+    router: Optional[ReplicaRouter] = None
+    replicas: list[ReplicaState]
+    pending_tags: dict[ABCConnection, set[str]]
+
+    def __init__(  # noqa: PLR0913
+        self,
+        url: str,
+        *,
+        sql_cache_size: int = 0,
+        statement_cache_size: Optional[int] = None,
+        result_cache: Optional[ResultCache] = None,
+        slow_query_threshold: Optional[float] = None,
+        explain_slow_queries: bool = False,
+        read_routing: Optional[str] = None,
+        read_your_writes: float = 1.0,
+        replica_max_lag: Optional[float] = None,
+        **backend_options,
+    ):
+        """Initialize dialect and database.
+
+        :param sql_cache_size: Cache compiled SQL for the given number of query shapes
+        :param statement_cache_size: Keep the given number of prepared statements per connection
+            (passed to asyncpg which prepares and caches the statements itself, other backends
+            raise ValueError)
+        :param result_cache: Cache results of the queries marked with `cached()`
+        :param slow_query_threshold: Log queries which run longer than the given seconds
+        :param explain_slow_queries: Capture plans of the slow queries in background
+        :param read_routing: Send plain selects to the replicas ("round_robin", "least_latency")
+        :param read_your_writes: Keep reads on the primary for the given seconds after a write
+            in the same task
+        :param replica_max_lag: Drop replicas which lag behind the primary for more than the
+            given seconds from the rotation (checked by `check_replicas`, Postgres only)
+        """
         if url.startswith(("sqlite://", "aiosqlite://")):
             backend_options.setdefault("functions", ())
             backend_options["functions"] = (
@@ -65,11 +147,31 @@ class Manager(Database):
                 ("date_trunc", 2, pw._sqlite_date_trunc),  # type: ignore[missing-attribute]
             )
 
+        if statement_cache_size is not None:
+            backend_options["statement_cache_size"] = statement_cache_size
+
         backend_options.setdefault("convert_params", True)
         super().__init__(url, logger=pw.logger, **backend_options)  # type: ignore[missing-attribute]
+        if statement_cache_size is not None and self.backend.name not in ASYNCPG:
+            raise ValueError(f"Statements cache is not supported for {self.backend.name}")
 
         self.models = WeakSet()
+        self.query_hooks = []
+        self.pending_tags = {}
+        self.replicas = [ReplicaState(backend) for backend in self.replica_backends]
+        self.replica_max_lag = replica_max_lag
         self.pw_database = get_db(self)
+        if sql_cache_size:
+            self.sql_cache = SQLCache(sql_cache_size)
+
+        self.result_cache = result_cache
+        if slow_query_threshold is not None:
+            self.slow_queries = self.on_query(
+                SlowQueryLog(self, slow_query_threshold, explain=explain_slow_queries)
+            )
+
+        if read_routing is not None:
+            self.router = ReplicaRouter(self, policy=read_routing, window=read_your_writes)
 
     @cached_property
     def Model(self) -> type[AIOModel]:  # noqa: N802
@@ -96,8 +198,9 @@ class Manager(Database):
 
     async def execute(self, query: Any, *params, **opts) -> Any:
         """Execute a given query with the given params."""
-        with process(query, params, raw=True) as (sql, props, _):
-            res = await super().execute(sql, *props, **opts)
+        event = self._query_event("execute")
+        with process(query, params, raw=True, cache=self.sql_cache, event=event) as (sql, props, _):
+            res = await self._fetch("execute", query, sql, props, event=event, **opts)
             if res is None:
                 return res
 
@@ -108,32 +211,230 @@ class Manager(Database):
 
     async def fetchval(self, query: Any, *params, **opts) -> Any:
         """Execute the given SQL and fetch a value."""
-        with process(query, params, raw=True) as (sql, props, _):
-            return await super().fetchval(sql, *props, **opts)
+        event = self._query_event("fetchval")
+        with process(query, params, raw=True, cache=self.sql_cache, event=event) as (sql, props, _):
+            return await self._fetch("fetchval", query, sql, props, event=event, **opts)
 
     async def fetchall(self, query: Any, *params, raw: bool = False, **opts) -> Any:
         """Execute the given SQL and fetch all."""
-        with process(query, params, raw=raw) as (sql, props, constructor):
-            res = await super().fetchall(sql, *props, **opts)
+        event = self._query_event("fetchall")
+        with process(query, params, raw=raw, cache=self.sql_cache, event=event) as (
+            sql,
+            props,
+            constructor,
+        ):
+            res = await self._fetch("fetchall", query, sql, props, event=event, **opts)
             return constructor(res)
 
     async def fetchmany(self, size: int, query: Any, *params, raw: bool = False, **opts) -> Any:
         """Execute the given SQL and fetch many of the size."""
-        with process(query, params, raw=raw) as (sql, props, constructor):
-            res = await super().fetchmany(size, sql, *props, **opts)
+        event = self._query_event("fetchmany")
+        with process(query, params, raw=raw, cache=self.sql_cache, event=event) as (
+            sql,
+            props,
+            constructor,
+        ):
+            res = await self._fetch("fetchmany", query, sql, props, size=size, event=event, **opts)
             return constructor(res)
 
     async def fetchone(self, query: Any, *params, raw: bool = False, **opts) -> Any:
         """Execute the given SQL and fetch one."""
-        with process(query, params, raw=raw) as (sql, props, constructor):
-            res = await super().fetchone(sql, *props, **opts)
+        event = self._query_event("fetchone")
+        with process(query, params, raw=raw, cache=self.sql_cache, event=event) as (
+            sql,
+            props,
+            constructor,
+        ):
+            res = await self._fetch("fetchone", query, sql, props, event=event, **opts)
             return constructor(res)
 
     async def iterate(self, query: Any, *params, raw: bool = False, **opts) -> AsyncIterator:
         """Execute the given SQL and iterate through results."""
-        with process(query, params, raw=raw) as (sql, props, constructor):
-            async for res in super().iterate(sql, *props, **opts):
-                yield constructor(res)
+        event = self._query_event("iterate")
+        with process(query, params, raw=raw, cache=self.sql_cache, event=event) as (
+            sql,
+            props,
+            constructor,
+        ):
+            if event is None:
+                async with self._route("iterate", query):
+                    async for res in super().iterate(sql, *props, **opts):
+                        yield constructor(res)
+                return
+
+            async with self._route("iterate", query), self._timed_connection(event):
+                event.rows = 0
+                start = perf_counter()
+                async for res in super().iterate(sql, *props, **opts):
+                    event.execute_time += perf_counter() - start
+                    event.rows += 1
+                    yield constructor(res)
+                    start = perf_counter()
+
+    async def stream(
+        self, query: Any, *params, batch_size: int = 1000, raw: bool = False
+    ) -> AsyncIterator:
+        """Execute the given SQL and iterate through results fetched by batches.
+
+        Rows are read from a server-side cursor (Postgres, MySQL) or with `fetchmany` (SQLite).
+        """
+        event = self._query_event("stream")
+        with process(query, params, raw=raw, cache=self.sql_cache, event=event) as (
+            sql,
+            props,
+            constructor,
+        ):
+            async with (
+                self._route("stream", query),
+                self._timed_connection(event) as conn,
+                aclosing(fetch_batches(conn, sql, props, batch_size)) as batches,
+            ):
+                start = perf_counter()
+                async for rows in batches:
+                    if event is not None:
+                        event.execute_time += perf_counter() - start
+                        event.rows = (event.rows or 0) + len(rows)
+
+                    for res in constructor(rows):
+                        yield res
+
+                    start = perf_counter()
+
+    async def fetch_columns(
+        self, query: Any, *params, numpy: bool = True, **opts
+    ) -> dict[str, Sequence[Any]]:
+        """Execute the given SQL and fetch the results as columns (name -> values).
+
+        Fields converters run once per column, numbers are packed into `array.array` (or NumPy
+        arrays when NumPy is installed and `numpy` is enabled).
+        """
+        event = self._query_event("fetchall")
+        with process(query, params, raw=True, cache=self.sql_cache, event=event) as (
+            sql,
+            props,
+            _,
+        ):
+            rows = await self._fetch("fetchall", query, sql, props, event=event, **opts)
+            if not rows:
+                return {}
+
+            start = perf_counter()
+            names, converters = list(rows[0].keys()), [None] * len(rows[0])
+            if isinstance(query, BaseQuery):
+                wrapper = query._get_cursor_wrapper(FakeCursor(rows[0]))  # type: ignore[]
+                wrapper.initialize()
+                names = list(getattr(wrapper, "columns", names))
+                converters = getattr(wrapper, "converters", converters)
+
+            res = to_columns(rows, names, converters, numpy=numpy)
+            if event is not None:
+                event.build_time += perf_counter() - start
+            return res
+
+    def on_query(self, hook: TVHook) -> TVHook:
+        """Register a hook which receives `QueryEvent` after every query.
+
+        Hooks are called synchronously, keep them fast (or remove them from `manager.query_hooks`).
+        """
+        self.query_hooks.append(hook)
+        return hook
+
+    def _query_event(self, method: str) -> Optional[QueryEvent]:
+        hooks = self.query_hooks
+        detector = current_detector.get()
+        if detector is not None:
+            hooks = [*hooks, detector.query]
+        return QueryEvent(method, hooks) if hooks else None
+
+    @asynccontextmanager
+    async def _timed_connection(self, event: Optional[QueryEvent]) -> AsyncIterator[Any]:
+        """Get the current connection and measure the waiting time."""
+        start = perf_counter()
+        async with self.connection(create=False) as conn:
+            if event is not None:
+                event.wait_time += perf_counter() - start
+            yield conn
+
+    async def _fetch(  # noqa: PLR0913
+        self,
+        method: str,
+        query: Any,
+        sql: str,
+        props: Sequence,
+        *,
+        size: Optional[int] = None,
+        event: Optional[QueryEvent] = None,
+        **opts,
+    ) -> Any:
+        """Run the SQL with the given method.
+
+        Results of cached queries are taken from the results cache (outside of transactions),
+        write queries invalidate the cached results for their tables (after commit inside
+        transactions).
+        """
+        cache = self.result_cache
+        if (
+            cache is not None
+            and method in CACHED_METHODS
+            and getattr(query, "_cached", False)
+            and not self.in_transaction
+        ):
+            key = cache_key(method, sql, [size, *props], opts)
+            stamp = await cache.stamp(query_tags(query))
+            data = await cache.get(key, stamp)
+            if data is not None:
+                cache.hits += 1
+                res = load_result(method, data)
+            else:
+                cache.misses += 1
+                async with self._route(method, query):
+                    res = await self._run_sql(method, sql, props, size, event, **opts)
+                await cache.set(key, stamp, dump_result(method, res), ttl=query._cache_ttl)
+
+        else:
+            async with self._route(method, query):
+                res = await self._run_sql(method, sql, props, size, event, **opts)
+            if cache is not None and isinstance(query, _WriteQuery):
+                await self._invalidate_tags([table_tag(query.table)])
+
+        if event is not None:
+            event.rows = count_rows(method, res)
+
+        return res
+
+    def _route(self, method: str, query: Any) -> AbstractAsyncContextManager:
+        """Get a connection context for the query (replicas for reads when routing is enabled)."""
+        router = self.router
+        if router is None:
+            return PRIMARY
+        return router.route(method, query, self.current_conn)
+
+    async def _run_sql(
+        self,
+        method: str,
+        sql: str,
+        props: Sequence,
+        size: Optional[int],
+        event: Optional[QueryEvent],
+        **opts,
+    ) -> Any:
+        if event is None:
+            return await self._run_driver(method, sql, props, size, **opts)
+
+        async with self._timed_connection(event):
+            start = perf_counter()
+            try:
+                return await self._run_driver(method, sql, props, size, **opts)
+            finally:
+                event.execute_time += perf_counter() - start
+
+    async def _run_driver(
+        self, method: str, sql: str, props: Sequence, size: Optional[int], **opts
+    ) -> Any:
+        check_streaming(self.current_conn)
+        if size is not None:
+            return await super().fetchmany(size, sql, *props, **opts)
+        return await getattr(super(), method)(sql, *props, **opts)
 
     # Working with Peewee
     # -------------------
@@ -152,6 +453,63 @@ class Manager(Database):
 
             db.enabled = False
 
+    def transaction(self, *, create: bool = False, **params) -> TransactionContext:
+        """Create a transaction (the cached results of the written tables are invalidated after
+        commit).
+        """
+        return Transaction(self, use_existing=not create, **params)
+
+    async def end_transaction(self, conn: ABCConnection, *, commit: bool):
+        """Invalidate the cached results of the tables written by the connection's transaction."""
+        tags = self.pending_tags.pop(conn, None)
+        if tags and commit and self.result_cache is not None:
+            await self.result_cache.invalidate(tags)
+
+    @asynccontextmanager
+    async def batch_relations(self) -> AsyncIterator[RelationsLoader]:
+        """Load foreign keys which are awaited concurrently with single queries."""
+        loader = RelationsLoader()
+        token = current_loader.set(loader)
+        try:
+            yield loader
+        finally:
+            current_loader.reset(token)
+
+    @asynccontextmanager
+    async def detect_n_plus_one(
+        self, threshold: int = 5, *, error: bool = False, sample_rate: float = 1.0
+    ) -> AsyncIterator[Optional[NPlusOneDetector]]:
+        """Detect lazy foreign key loads and queries which are repeated in the current context.
+
+        :param threshold: Report a pattern when it's repeated the given number of times
+        :param error: Raise `NPlusOneError` instead of warnings (for tests)
+        :param sample_rate: Enable the detection for the given fraction of calls (production)
+        """
+        if sample_rate < 1 and random() >= sample_rate:  # noqa: S311
+            yield None
+            return
+
+        detector = NPlusOneDetector(threshold, error=error)
+        token = current_detector.set(detector)
+        try:
+            yield detector
+        finally:
+            current_detector.reset(token)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[Session]:
+        """Keep loaded instances in an identity map and flush changed instances on exit.
+
+        `get_by_id` and foreign keys return the tracked instances without queries.
+        """
+        session = Session(self)
+        token = current_session.set(session)
+        try:
+            yield session
+            await session.flush()
+        finally:
+            current_session.reset(token)
+
     # Query methods
     # -------------
 
@@ -191,35 +549,181 @@ class Manager(Database):
         query._database = self.pw_database  # type: ignore[]
         return await self.fetchval(query)
 
-    async def prefetch(self, sq: Query, *subqueries, **kwargs) -> Any:
-        """Prefetch results for the given query and subqueries.."""
+    async def prefetch(self, sq: Query, *subqueries, concurrency: int = 1, **kwargs) -> Any:
+        """Prefetch results for the given query and subqueries.
+
+        :param concurrency: Run up to the given number of subqueries in parallel on separate
+            connections (outside of transactions)
+        """
         if not subqueries:
             return await self.run(sq)
 
-        result = None
         prefetch_type = kwargs.pop("prefetch_type", PREFETCH_TYPE.WHERE)
         fixed_queries = pw.prefetch_add_subquery(sq, subqueries, prefetch_type)  # type: ignore[missing-attribute]
-        deps: dict[PWModel, dict] = {}
-        rel_map: dict[PWModel, list] = {}
-        for pq in reversed(fixed_queries):
-            query_model = pq.model
-            if pq.fields:
-                for rel_model in pq.rel_models:
-                    rel_map.setdefault(rel_model, [])
-                    rel_map[rel_model].append(pq)
-
-            deps.setdefault(query_model, {})
-            id_map = deps[query_model]
-            has_relations = bool(rel_map.get(query_model))
-            result = await self.run(pq.query)
-            for instance in result:
-                if pq.fields:
-                    pq.store_instance(instance, id_map)
-                if has_relations:
-                    for rel in rel_map[query_model]:
-                        rel.populate_instance(instance, deps[rel.model])
-
-        return result
+        fixed_queries = fixed_queries[::-1]
+
+        # Subqueries filter by the parent queries in SQL, so they do not depend on each other
+        results = await self._run_concurrently([pq.query for pq in fixed_queries], concurrency)
+        return populate_prefetch(fixed_queries, results)
+
+    async def prefetch_iter(
+        self, sq: ModelSelect, *subqueries, chunk_size: int = 1000, concurrency: int = 1, **kwargs
+    ) -> AsyncIterator:
+        """Iterate through the given query by chunks and prefetch the subqueries per chunk.
+
+        Unordered queries are paginated by the primary key, others use limit/offset.
+        """
+        pk = sq.model._meta.primary_key  # type: ignore[]
+        keyset = isinstance(pk, Field) and not (
+            sq._order_by or sq._limit is not None or sq._offset is not None  # type: ignore[]
+        )
+        chunks = prefetch_chunks(
+            self.run,
+            lambda queries: self._run_concurrently(queries, concurrency),
+            sq,
+            subqueries,
+            chunk_size=chunk_size,
+            keyset=keyset,
+            prefetch_type=kwargs.pop("prefetch_type", PREFETCH_TYPE.WHERE),
+        )
+        async for obj in chunks:
+            yield obj
+
+    async def copy_out(
+        self,
+        query: Any,
+        output: Any,
+        *,
+        format: str = "csv",  # noqa: A002
+        batch_size: int = 1000,
+    ) -> int:
+        """Copy the query results into the output and return the number of the rows.
+
+        The output is a path, a binary file-like object or a coroutine function which receives
+        chunks of bytes. Postgres (asyncpg) uses COPY, other databases write CSV.
+
+        :param batch_size: Write the rows by chunks of the given size (asyncpg writes the chunks
+            as the server sends them)
+        """
+        if self.backend.name in ASYNCPG:
+            with process(query, (), raw=True, cache=self.sql_cache) as (sql, props, _):
+                async with self.connection(create=False) as conn:
+                    return await copy_from_query_asyncpg(
+                        conn, sql, props, output=output, format=format
+                    )
+
+        if format != "csv":
+            raise ValueError(f"Only CSV format is supported for {self.backend.name}")
+
+        with ExitStack() as stack:
+            if isinstance(output, (str, PathLike)):
+                output = stack.enter_context(open(output, "wb"))  # noqa: ASYNC230, PTH123
+
+            write = output if iscoroutinefunction(output) else None
+            res = 0
+            buffer = StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            async for row in self.stream(query, batch_size=batch_size, raw=True):
+                writer.writerow(row.values() if isinstance(row, Mapping) else row)
+                res += 1
+                if res % batch_size == 0:
+                    await copy_write(output, write, buffer)
+
+            await copy_write(output, write, buffer)
+
+        return res
+
+    @property
+    def in_memory(self) -> bool:
+        """Check that the database is in-memory SQLite (every connection is a separate database)."""
+        backend = self.backend
+        return backend.db_type == "sqlite" and backend.url.path in {"", "/", "/:memory:"}
+
+    @property
+    def in_transaction(self) -> bool:
+        """Check that the current connection has an active transaction."""
+        conn = self.current_conn
+        return bool(conn and conn.transactions)
+
+    @property
+    def pool_size(self) -> Optional[int]:
+        """Get the maximum size of the connections pool (None for backends without pools)."""
+        options = getattr(self.backend, "pool_options", None)
+        if options is None:
+            return None
+        return options.get("max_size", options.get("maxsize", DEFAULT_POOL_SIZE))
+
+    async def gather(self, *queries: Query, max_concurrency: Optional[int] = None) -> list[Any]:
+        """Run the independent queries concurrently on separate connections.
+
+        Results are returned in the order of the queries. Inside transactions (and with in-memory
+        SQLite) the queries run one by one on the current connection.
+
+        :param max_concurrency: Use up to the given number of connections (by default the free
+            connections of the pool)
+        """
+        if max_concurrency is None:
+            max_concurrency = (self.pool_size or DEFAULT_POOL_SIZE) - (
+                self.current_conn is not None
+            )
+
+        return await self._run_concurrently(queries, max_concurrency)
+
+    def replica(self, **params) -> ConnectionContext:
+        """Get a read-only connection to a healthy replica (the primary when there are none)."""
+        replicas = [state for state in self.replicas if state.healthy]
+        if not replicas:
+            if not self.replicas:
+                raise RuntimeError("No replicas configured for this database")
+            return self.connection(**params)
+
+        backend = choice(replicas).backend  # noqa: S311
+        return ConnectionContext(backend, use_existing=False, read_only=True, **params)
+
+    async def check_replicas(self, *, timeout: float = 5.0) -> list[ReplicaState]:
+        """Probe the replicas concurrently and update their health."""
+        max_lag = self.replica_max_lag
+        await gather(*(state.check(timeout=timeout, max_lag=max_lag) for state in self.replicas))
+        return self.replicas
+
+    @asynccontextmanager
+    async def monitor_replicas(
+        self, interval: float = 5.0, *, timeout: float = 5.0
+    ) -> AsyncIterator[list[ReplicaState]]:
+        """Check the replicas health in background with the given interval (seconds)."""
+        stop = create_event()
+
+        async def monitor():
+            # Checks do not raise, failed probes mark the replicas as unhealthy
+            while not await wait_event(stop, interval):
+                await self.check_replicas(timeout=timeout)
+
+        await self.check_replicas(timeout=timeout)
+        spawn(monitor)
+        try:
+            yield self.replicas
+        finally:
+            stop.set()
+
+    def replicas_metrics(self) -> list[dict[str, Any]]:
+        """Get the replicas health and statistics."""
+        return [state.metrics() for state in self.replicas]
+
+    async def _run_concurrently(self, queries: Sequence[Query], concurrency: int) -> list[Any]:
+        """Run the given queries in parallel on separate connections."""
+        if concurrency < 2 or len(queries) < 2 or self.in_transaction or self.in_memory:
+            return [await self.run(query) for query in queries]
+
+        results: list[Any] = [None] * len(queries)
+        pending = iter(enumerate(queries))
+
+        async def worker():
+            for idx, query in pending:
+                async with self.connection(create=True):
+                    results[idx] = await self.run(query)
+
+        await gather(*(worker() for _ in range(min(concurrency, len(queries)))))
+        return results
 
     # Model methods
     # -------------
@@ -255,6 +759,24 @@ class Manager(Database):
             ctx = schema._drop_table(**opts)  # type: ignore[]
             await self.execute(ctx)
 
+        await self.invalidate(*models_cls)
+
+    async def invalidate(self, *models_cls: type[PWModel]):
+        """Invalidate the cached results for the given models (after commit inside transactions)."""
+        await self._invalidate_tags([table_tag(model_cls) for model_cls in models_cls])
+
+    async def _invalidate_tags(self, tags: list[str]):
+        cache = self.result_cache
+        if cache is None:
+            return
+
+        conn = self.current_conn
+        if conn is not None and conn.transactions:
+            # Concurrent reads would cache the old rows again until the commit
+            self.pending_tags.setdefault(conn, set()).update(tags)
+        else:
+            await cache.invalidate(tags)
+
     async def get_or_none(
         self, model_cls: type[TVModel], *args: Node, **kwargs
     ) -> Optional[TVModel]:
@@ -274,6 +796,12 @@ class Manager(Database):
         return res
 
     async def get_by_id(self, model_cls: type[TVModel], pk) -> TVModel:
+        session = current_session.get()
+        if session is not None:
+            inst = session.get(model_cls, pk)
+            if inst is not None:
+                return inst  # type: ignore[]
+
         return await self.get(model_cls, model_cls._meta.primary_key == pk)  # type: ignore[]
 
     async def set_by_id(self, model_cls: type[PWModel], key, value) -> Any:
@@ -305,6 +833,58 @@ class Manager(Database):
         inst = model_cls(**values)
         return await self.save(inst, force_insert=True)
 
+    async def copy_in(
+        self,
+        model_cls: type[PWModel],
+        rows: Iterable[Any],
+        fields: Optional[Sequence[Union[str, Field]]] = None,
+    ) -> int:
+        """Bulk load rows into the model's table and return the number of the rows.
+
+        Rows are model instances, mappings or sequences of the fields values. Postgres (asyncpg)
+        uses the binary COPY protocol, other databases fall back to batched multi-row inserts.
+        """
+        meta = model_cls._meta  # type: ignore[]
+        if fields is None:
+            fields = [
+                field
+                for field in meta.sorted_fields
+                if not (meta.auto_increment and field is meta.primary_key)
+            ]
+        columns: list[Field] = [
+            meta.fields[field] if isinstance(field, str) else field for field in fields
+        ]
+        records = copy_values(model_cls, rows, columns)
+
+        if self.backend.name in ASYNCPG:
+            # COPY runs on the primary and is recorded as a write (the router, the results cache)
+            async with self._route("execute", None), self.connection(create=False) as conn:
+                res = await copy_records_asyncpg(
+                    conn,
+                    meta.table_name,
+                    (
+                        [
+                            field.db_value(value)
+                            for field, value in zip(columns, values, strict=True)
+                        ]
+                        for values in records
+                    ),
+                    columns=[field.column_name for field in columns],
+                    schema=meta.schema,
+                )
+
+            await self._invalidate_tags([table_tag(model_cls)])
+            return res
+
+        batch_size = max(1, self.pw_database.param_limit // len(columns))
+        res = 0
+        async with self.transaction():
+            for batch in chunked(records, batch_size):
+                await self.execute(model_cls.insert_many(batch, fields=columns))
+                res += len(batch)
+
+        return res
+
     # Instance methods
     # ----------------
 
@@ -365,6 +945,10 @@ class Manager(Database):
                 inst._pk = pk  # type: ignore[]
 
         inst._dirty.clear()  # type: ignore[]
+        session = current_session.get()
+        if session is not None:
+            session.add(inst)
+
         return inst
 
     async def delete_instance(
@@ -378,6 +962,10 @@ class Manager(Database):
                 else:
                     await self.execute(fk.model.delete().where(query))
 
+        session = current_session.get()
+        if session is not None:
+            session.discard(inst)
+
         return await self.execute(inst.delete().where(inst._pk_expr()))  # type: ignore[]
 
 
@@ -391,19 +979,190 @@ pw.EXCEPTIONS["DuplicateTableError"] = OperationalError  # type: ignore[missing-
 
 
 @contextmanager
-def process(query: Any, params: Sequence, *, raw: bool) -> Generator:
+def process(
+    query: Any,
+    params: Sequence,
+    *,
+    raw: bool,
+    cache: Optional[SQLCache] = None,
+    event: Optional[QueryEvent] = None,
+) -> Generator:
+    start = perf_counter()
     constructor = identity
 
     if isinstance(query, BaseQuery):
         if not raw:
-            constructor = Constructor(query)
-        query, params = query.sql()
+            constructor = Constructor(query, event)
+        query, params = query.sql() if cache is None else cache.compile(query)
 
     if isinstance(query, Context):
         query, params = query.query()
 
-    with __exception_wrapper__:
-        yield query, params, constructor
+    if event is None:
+        with __exception_wrapper__:
+            yield query, params, constructor
+        return
+
+    event.sql, event.params = query, params
+    event.compile_time = perf_counter() - start
+    try:
+        with __exception_wrapper__:
+            yield query, params, constructor
+
+    except Exception as exc:
+        event.error = exc
+        raise
+
+    finally:
+        event.emit()
+
+
+def count_rows(method: str, res: Any) -> Optional[int]:
+    """Get a number of the fetched (or affected) rows."""
+    if method == "execute":
+        return res[0] if isinstance(res, tuple) and isinstance(res[0], int) else None
+    if method == "fetchval":
+        return 1
+    if method == "fetchone":
+        return int(res is not None)
+    return len(res)
+
+
+def populate_prefetch(fixed_queries: Sequence, results: Sequence[Any]) -> Any:
+    """Populate the prefetched relations (from the subqueries to the root) and return the root."""
+    result = None
+    deps: dict[PWModel, dict] = {}
+    rel_map: dict[PWModel, list] = {}
+    for pq, result in zip(fixed_queries, results, strict=True):
+        query_model = pq.model
+        if pq.fields:
+            for rel_model in pq.rel_models:
+                rel_map.setdefault(rel_model, [])
+                rel_map[rel_model].append(pq)
+
+        deps.setdefault(query_model, {})
+        id_map = deps[query_model]
+        has_relations = bool(rel_map.get(query_model))
+        for instance in result:
+            if pq.fields:
+                pq.store_instance(instance, id_map)
+            if has_relations:
+                for rel in rel_map[query_model]:
+                    rel.populate_instance(instance, deps[rel.model])
+
+    return result
+
+
+async def prefetch_chunks(  # noqa: PLR0913
+    run: Callable[[Any], Awaitable[Any]],
+    run_many: Callable[[list[Any]], Awaitable[list[Any]]],
+    sq: ModelSelect,
+    subqueries: Sequence[Any],
+    *,
+    chunk_size: int,
+    keyset: bool,
+    prefetch_type: Any,
+) -> AsyncIterator:
+    """Select the query by chunks (by the primary key or limit/offset) and prefetch per chunk."""
+    model = sq.model
+    pk = model._meta.primary_key  # type: ignore[]
+    if keyset:
+        sq = sq.order_by(pk)
+
+    limit, offset = sq._limit, sq._offset or 0  # type: ignore[]
+    fetched, last = 0, None
+    while True:
+        size = chunk_size if limit is None else min(chunk_size, limit - fetched)
+        if size <= 0:
+            break
+
+        if not keyset:
+            page = sq.limit(size).offset(offset + fetched)
+        elif last is None:
+            page = sq.limit(size)
+        else:
+            page = sq.where(pk > last).limit(size)
+
+        chunk = await run(page)
+        if not chunk:
+            break
+
+        if subqueries:
+            # Restrict the subqueries to the chunk and reuse the loaded instances
+            root = (
+                model.select().where(pk.in_([obj._pk for obj in chunk]))  # type: ignore[]
+                if isinstance(pk, Field)
+                else page
+            )
+            fixed_queries = pw.prefetch_add_subquery(root, subqueries, prefetch_type)  # type: ignore[missing-attribute]
+            fixed_queries = fixed_queries[::-1]
+            results = await run_many([pq.query for pq in fixed_queries[:-1]])
+            populate_prefetch(fixed_queries, [*results, chunk])
+
+        for obj in chunk:
+            yield obj
+
+        fetched += len(chunk)
+        if len(chunk) < size:
+            break
+
+        last = chunk[-1]._pk
+
+
+def copy_values(model_cls: type[PWModel], rows: Iterable[Any], fields: list[Field]) -> Iterator:
+    """Get the fields values from the given rows (fill missing values with defaults)."""
+    defaults = model_cls._meta.defaults  # type: ignore[]
+    names = [field.name for field in fields]
+    for row in rows:
+        data = row.__data__ if isinstance(row, PWModel) else row
+        if not isinstance(data, Mapping):
+            yield list(data)
+            continue
+
+        values = []
+        for field, name in zip(fields, names, strict=True):
+            if name in data:
+                values.append(data[name])
+            else:
+                default = defaults.get(field)
+                values.append(default() if callable(default) else default)
+        yield values
+
+
+async def copy_write(output: Any, write: Optional[Callable], buffer: StringIO):
+    """Flush the buffer into the output."""
+    data = buffer.getvalue().encode()
+    if not data:
+        return
+
+    buffer.seek(0)
+    buffer.truncate()
+    if write is None:
+        output.write(data)
+    else:
+        await write(data)
+
+
+class Transaction(TransactionContext):
+    """A transaction context which notifies the manager when the outer transaction ends."""
+
+    __slots__ = ("manager",)
+
+    def __init__(self, manager: Manager, **params):
+        super().__init__(manager.backend, **params)
+        self.manager = manager
+
+    async def __aexit__(self, *args):
+        conn = self.conn
+        try:
+            await super().__aexit__(*args)
+        except BaseException:
+            if not conn.transactions:
+                await self.manager.end_transaction(conn, commit=False)
+            raise
+
+        if not conn.transactions:
+            await self.manager.end_transaction(conn, commit=args[0] is None)
 
 
 class RunWrapper:
@@ -434,10 +1193,14 @@ class FakeCursor:
 class Constructor:
     """Process results."""
 
-    __slots__ = "processor", "query"
+    __slots__ = "event", "processor", "query"
+
+    # Rows processors shared between queries with the same shape
+    processors: ClassVar[LRUCache[tuple, Callable]] = LRUCache(512)
 
-    def __init__(self, query: BaseQuery):
+    def __init__(self, query: BaseQuery, event: Optional[QueryEvent] = None):
         self.query = query
+        self.event = event
         self.processor: Optional[Callable] = None
 
     def __call__(self, res: Union[Mapping, Sequence[Mapping]]) -> Union[Any, Sequence[Any]]:
@@ -445,19 +1208,88 @@ class Constructor:
         if not res:  # None or empty sequence
             return res
 
+        event = self.event
+        if event is None:
+            return self.build(res)
+
+        start = perf_counter()
+        try:
+            return self.build(res)
+        finally:
+            event.build_time += perf_counter() - start
+
+    def build(self, res: Union[Mapping, Sequence[Mapping]]) -> Union[Any, Sequence[Any]]:
+        """Build results from rows."""
+
+        # Replace the loaded instances with the tracked ones
+        session = current_session.get()
         if isinstance(res, Sequence):
             processor = self.get_processor(res[0])
-            return [processor(r) for r in res]
+            if session is None:
+                return [processor(r) for r in res]
+            return [session.add(processor(r)) for r in res]
 
         processor = self.get_processor(res)
-        return processor(res)
+        if session is None:
+            return processor(res)
+        return session.add(processor(res))
 
     def get_processor(self, rec: Mapping) -> Callable:
         """Get and cache a rows processor."""
         if self.processor is None:
-            cursor = FakeCursor(rec)
-            wrapper = self.query._get_cursor_wrapper(cursor)  # type: ignore[]
-            wrapper.initialize()
-            self.processor = wrapper.process_row
+            key = processor_key(self.query, rec)
+            processor = None if key is None else self.processors.get(key)
+            if processor is None:
+                cursor = FakeCursor(rec)
+                wrapper = self.query._get_cursor_wrapper(cursor)  # type: ignore[]
+                wrapper.initialize()
+                processor = get_builder(wrapper) or wrapper.process_row
+                if key is not None:
+                    self.processors[key] = processor
+
+            self.processor = processor
 
         return self.processor
+
+
+def processor_key(query: BaseQuery, rec: Mapping) -> Optional[tuple]:
+    """Get a key to share rows processors between queries.
+
+    The key contains the query's model, selected fields, row type, joins and the result columns.
+    Return None when the query shape is not supported.
+    """
+    if not isinstance(query, ModelSelect):
+        return None
+
+    selection = []
+    for node in query._returning:  # type: ignore[]
+        if not isinstance(node, Field):
+            return None
+        selection.append(id(node))
+
+    joins: tuple = ()
+    if query._joins:  # type: ignore[]
+        sources = []
+        for node in query._from_list:  # type: ignore[]
+            source = node
+            while isinstance(source, Join):
+                source = source.lhs
+            if not isclass(source):
+                return None
+            sources.append(source)
+
+        joins = (tuple(sources),)
+        for src, items in query._joins.items():  # type: ignore[]
+            if not isclass(src) or not all(isclass(dest) for dest, *_ in items):
+                return None
+            joins += ((src, tuple(items)),)
+
+    return (
+        type(query),
+        query.model,
+        query._row_type,  # type: ignore[]
+        getattr(query, "_constructor", None),
+        tuple(selection),
+        joins,
+        tuple(rec.keys()),
+    )
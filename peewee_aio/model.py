@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from contextlib import suppress
 from typing import (  # py39
     TYPE_CHECKING,
     Any,
@@ -12,18 +13,25 @@ from typing import (  # py39
     Generic,
     Iterable,
     Literal,
+    Sequence,
     cast,
     overload,
 )
+from uuid import uuid4
 
 from peewee import (
     SQL,
+    AutoField,
+    BigAutoField,
+    BigIntegerField,
     Case,
     ColumnBase,
     CompositeKey,
+    Entity,
     Expression,
     Field,
     ForeignKeyField,
+    IntegerField,
     Metadata,
     Model,
     ModelAlias,
@@ -40,7 +48,11 @@ from peewee import (
     chunked,
 )
 
+from .bulk import update_from_values
+from .databases import Database, MySQLDatabase
+from .loader import current_loader
 from .types import TV, TVAIOModel
+from .utils import seek_condition, seek_orderings, seek_values, values_getter
 
 if TYPE_CHECKING:
     from typing_extensions import Self  # py310
@@ -49,6 +61,9 @@ if TYPE_CHECKING:
 
     from .manager import Manager
 
+# Values which need more `IN` queries are checked with a temporary table (`exists_many`)
+TEMP_TABLE_BATCHES = 10
+
 
 class AIOModelBase(ModelBase):
     inheritable = ModelBase.inheritable & {"manager"}
@@ -147,15 +162,27 @@ class AIOModel(Model, metaclass=AIOModelBase):
         else:
             pk_fields = None
 
-        batches = chunked(model_list, batch_size) if batch_size is not None else [model_list]
-        for batch in batches:
-            accum = ([getattr(model, f) for f in attrs] for model in batch)
+        if batch_size is None:
+            # Fit the batches into the bind parameters limit of the database
+            param_limit = getattr(meta.database, "param_limit", Database.param_limit)
+            batch_size = max(1, param_limit // max(1, len(fields)))
+
+        batches = list(chunked(model_list, batch_size))
+        if len(batches) == 1:
+            return await cls._insert_batch(batches[0], fields, attrs, pk_fields)
+
+        async with cls._manager.transaction():
+            for batch in batches:
+                await cls._insert_batch(batch, fields, attrs, pk_fields)
 
-            res = await cls.insert_many(accum, fields=fields)
-            if pk_fields and res is not None:
-                for row, model in zip(res, batch, strict=False):
-                    for pk_field, obj_id in zip(pk_fields, row, strict=False):
-                        setattr(model, pk_field.name, obj_id)
+    @classmethod
+    async def _insert_batch(cls, batch: list[AIOModel], fields, attrs, pk_fields):
+        accum = ([getattr(model, f) for f in attrs] for model in batch)
+        res = await cls.insert_many(accum, fields=fields)
+        if pk_fields and res is not None:
+            for row, model in zip(res, batch, strict=False):
+                for pk_field, obj_id in zip(pk_fields, row, strict=False):
+                    setattr(model, pk_field.name, obj_id)
 
     @classmethod
     async def bulk_update(
@@ -163,7 +190,14 @@ class AIOModel(Model, metaclass=AIOModelBase):
         model_list: Iterable[TVAIOModel],
         fields: Iterable[str | Field],
         batch_size: int | None = None,
+        strategy: str | None = None,
     ) -> int:
+        """Update the given fields of the instances.
+
+        Strategies: "values" (`UPDATE ... FROM (VALUES ...)`), "join" (a joined derived table) and
+        "case" (a `CASE` per field). By default it depends on the database, which supports its
+        default strategy and "case" only.
+        """
         meta = cls._meta
         if isinstance(meta.primary_key, CompositeKey):
             raise TypeError(
@@ -179,25 +213,213 @@ class AIOModel(Model, metaclass=AIOModelBase):
             for field in model_fields
         ]
 
+        database = meta.database
+        default_strategy = getattr(database, "update_strategy", Database.update_strategy)
+        strategy = strategy or default_strategy
+        if strategy not in {"values", "join", "case"}:
+            raise ValueError(f"Unknown update strategy: {strategy!r}")
+
+        # The joined strategies depend on the database syntax
+        if strategy not in {"case", default_strategy}:
+            raise ValueError(
+                f"The {strategy!r} update strategy is not supported by {type(database).__name__}"
+            )
+
+        if batch_size is None:
+            param_limit = getattr(database, "param_limit", Database.param_limit)
+            row_params = 1 + len(model_fields) * (2 if strategy == "case" else 1)
+            batch_size = max(1, param_limit // row_params)
+
+        batches = list(chunked(model_list, batch_size))
+        if len(batches) == 1:
+            return await cls._update_batch(batches[0], model_fields, attrs, strategy)
+
         n = 0
-        pk = meta.primary_key
-        batches = chunked(model_list, batch_size) if batch_size is not None else [model_list]
-        for batch in batches:
-            id_list = [model._pk for model in batch]
-            update = {}
-            for field, attr in zip(model_fields, attrs, strict=False):
-                accum = []
-                for model in batch:
-                    value = getattr(model, attr)
-                    if not isinstance(value, Node):
-                        value = field.to_value(value)
-                    accum.append((pk.to_value(model._pk), value))
-                update[field] = Case(pk, accum)
-
-            n += cast("int", await cls.update(update).where(cls._meta.primary_key.in_(id_list)))
+        async with cls._manager.transaction():
+            for batch in batches:
+                n += await cls._update_batch(batch, model_fields, attrs, strategy)
 
         return n
 
+    @classmethod
+    async def _update_batch(
+        cls, batch: list[AIOModel], fields: list[Field], attrs: list[str], strategy: str
+    ) -> int:
+        pk = cls._meta.primary_key
+        rows = [[model._pk, *(getattr(model, attr) for attr in attrs)] for model in batch]
+
+        # Expressions are supported by CASE only
+        if strategy != "case" and not any(isinstance(value, Node) for row in rows for value in row):
+            query = update_from_values(cls, fields, rows, strategy)
+            res = await cls._manager.execute(query)
+            if not isinstance(query, Query):
+                # Compiled joined updates are not recognized as writes
+                await cls._manager.invalidate(cls)
+            return cast("int", res)
+
+        update = {}
+        for idx, field in enumerate(fields, 1):
+            accum = []
+            for row in rows:
+                value = row[idx]
+                if not isinstance(value, Node):
+                    value = field.to_value(value)
+                accum.append((pk.to_value(row[0]), value))
+            update[field] = Case(pk, accum)
+
+        id_list = [row[0] for row in rows]
+        return cast("int", await cls.update(update).where(pk.in_(id_list)))
+
+    @classmethod
+    async def bulk_load(
+        cls: type[TVAIOModel],
+        model_list: Iterable[TVAIOModel],
+        *fields: str | Field,
+        batch_size: int | None = None,
+    ):
+        """Load the given fields (by default the fields which are not loaded) of the instances.
+
+        The values are selected by primary keys with `IN` queries, modified fields are kept.
+        """
+        meta = cls._meta
+        pk = meta.primary_key
+        if isinstance(pk, CompositeKey) or not isinstance(pk, Field):
+            raise TypeError("bulk_load() requires a single primary key field.")
+
+        instances: dict[Any, list[TVAIOModel]] = {}
+        for inst in model_list:
+            value = inst.__data__.get(pk.name)
+            if value is not None:
+                instances.setdefault(value, []).append(inst)
+
+        model_fields = [cast("Field", meta.fields[f]) if isinstance(f, str) else f for f in fields]
+        if not model_fields:
+            model_fields = [
+                field
+                for field in meta.sorted_fields
+                if any(
+                    field.name not in inst.__data__
+                    for group in instances.values()
+                    for inst in group
+                )
+            ]
+
+        if not (instances and model_fields):
+            return
+
+        if batch_size is None:
+            batch_size = getattr(meta.database, "param_limit", Database.param_limit)
+
+        for batch in chunked(instances, batch_size):
+            await cls._load_batch(pk, {value: instances[value] for value in batch}, model_fields)
+
+    @classmethod
+    async def _load_batch(
+        cls, pk: Field, instances: dict[Any, Sequence[AIOModel]], fields: list[Field]
+    ):
+        names = [field.name for field in fields]
+        qs = cls.select(pk, *fields).where(pk.in_(list(instances)))  # type: ignore[]
+        rows = await qs.tuples()
+        for value, *values in rows:
+            for inst in instances[value]:
+                data, dirty = inst.__data__, inst._dirty
+                for name, val in zip(names, values, strict=True):
+                    if name not in dirty:
+                        data[name] = val
+
+    @classmethod
+    async def exists_many(
+        cls,
+        field: str | Field,
+        values: Iterable[Any],
+        *,
+        batch_size: int | None = None,
+        temp_table: bool | None = None,
+    ) -> set[Any]:
+        """Get the given values which are present in the field.
+
+        The values are checked with `SELECT DISTINCT ... IN (...)` queries chunked by the bind
+        parameters limit of the database. Values which need more than `TEMP_TABLE_BATCHES`
+        queries (or `temp_table=True`) are loaded into a temporary table joined by a single query.
+        """
+        meta = cls._meta
+        model_field = cast("Field", meta.fields[field]) if isinstance(field, str) else field
+
+        # Compare the values as they are stored in the database
+        keys: dict[Any, Any] = {}
+        for value in values:
+            if value is not None:
+                keys.setdefault(model_field.db_value(value), value)
+
+        if not keys:
+            return set()
+
+        if batch_size is None:
+            batch_size = getattr(meta.database, "param_limit", Database.param_limit)
+
+        if temp_table is None:
+            temp_table = len(keys) > batch_size * TEMP_TABLE_BATCHES
+
+        if temp_table:
+            found = await cls._exists_temp_table(model_field, list(keys), batch_size)
+
+        else:
+            found = []
+            for batch in chunked(keys, batch_size):
+                values = [keys[key] for key in batch]
+                qs = cls.select(model_field).where(model_field.in_(values))  # type: ignore[]
+                found += await qs.distinct().scalars()
+
+        return {keys[key] for key in map(model_field.db_value, found) if key in keys}
+
+    @classmethod
+    async def _exists_temp_table(cls, field: Field, keys: list[Any], batch_size: int) -> list[Any]:
+        database = cls._meta.database
+        table = Table(f"exists_{uuid4().hex}", ("value",)).bind(database)
+
+        # Auto increment fields are stored as integers
+        column = field
+        if isinstance(field, BigAutoField):
+            column = BigIntegerField()
+        elif isinstance(field, AutoField):
+            column = IntegerField()
+
+        ctx = database.get_sql_context()
+        create = ctx.literal("CREATE TEMPORARY TABLE ").sql(Entity(table.__name__))
+        create.literal(" (").sql(Entity("value")).literal(" ").sql(column.ddl_datatype(ctx))
+        create.literal(")")
+
+        # MySQL commits the transactions on DROP TABLE (but not on dropping temporary ones)
+        mysql = isinstance(database, MySQLDatabase)
+        drop = database.get_sql_context().literal(
+            "DROP TEMPORARY TABLE " if mysql else "DROP TABLE "
+        )
+        drop.sql(Entity(table.__name__))
+
+        # Temporary tables live on a connection, the transaction keeps the queries on it
+        manager = cls._manager
+        async with manager.transaction():
+            await manager.execute(create)
+            try:
+                for batch in chunked(keys, batch_size):
+                    await manager.execute(
+                        table.insert([(key,) for key in batch], columns=[table.value])  # type: ignore[]
+                    )
+
+                qs = cls.select(field).join(table, on=(field == table.value)).distinct()
+                res = await qs.scalars()
+
+            except Exception:
+                # The rollback drops the table on Postgres/SQLite (an aborted Postgres transaction
+                # rejects any query), MySQL keeps temporary tables until the connection is closed
+                if mysql:
+                    with suppress(Exception):
+                        await manager.execute(drop)
+                raise
+
+            await manager.execute(drop)
+            return res
+
     # Queryset methods
     # ----------------
 
@@ -211,7 +433,10 @@ class AIOModel(Model, metaclass=AIOModelBase):
     ) -> AIOModelSelect[TVAIOModel]:
         return AIOModelSelect(
             cls,
-            select or cls._meta.sorted_fields,
+            select
+            or [
+                field for field in cls._meta.sorted_fields if not getattr(field, "deferred", False)
+            ],
             is_default=not select,
         )
 
@@ -257,6 +482,31 @@ class AIOModel(Model, metaclass=AIOModelBase):
     async def delete_instance(self, **kwargs):  # type: ignore[bad-override]
         return await self._manager.delete_instance(self, **kwargs)
 
+    async def load(self, *fields: str | Field) -> Self:
+        """Load the given fields (by default the deferred fields which are not loaded).
+
+        Loads of several instances are batched inside `manager.batch_relations()`.
+        """
+        meta = self._meta
+        model_fields = [cast("Field", meta.fields[f]) if isinstance(f, str) else f for f in fields]
+        if not model_fields:
+            model_fields = [
+                field for field in meta.sorted_fields if field.name not in self.__data__
+            ]
+            if not model_fields:
+                return self
+
+        loader = current_loader.get()
+        if loader is None:
+            await self.bulk_load([self], *model_fields)
+        else:
+            await loader.load_fields(self, model_fields)
+
+        if any(field.name not in self.__data__ for field in model_fields):
+            raise self.DoesNotExist(f"{self!r} does not exist")
+
+        return self
+
     @overload
     def fetch(
         self, fk: AIOForeignKeyField[Coroutine[None, None, TV]], *, silent: bool = False
@@ -332,8 +582,18 @@ class BaseModelSelect(AIOQuery[TVAIOModel]):
 
     __sub__ = except_
 
-    async def prefetch(self, *subqueries) -> list[TVAIOModel]:
-        return await self.manager.prefetch(self, *subqueries)
+    async def prefetch(self, *subqueries, **kwargs) -> list[TVAIOModel]:
+        return await self.manager.prefetch(self, *subqueries, **kwargs)
+
+    def prefetch_iter(self, *subqueries, **kwargs) -> AsyncIterator[TVAIOModel]:
+        return self.manager.prefetch_iter(self, *subqueries, **kwargs)  # type: ignore[]
+
+    def stream(self, batch_size: int = 1000) -> AsyncIterator[TVAIOModel]:
+        return self.manager.stream(self, batch_size=batch_size)
+
+    async def columns_result(self, *, numpy: bool = True) -> dict[str, Sequence[Any]]:
+        """Fetch the results as columns (name -> values)."""
+        return await self.manager.fetch_columns(self, numpy=numpy)
 
 
 class TQuery:
@@ -356,6 +616,9 @@ class TQuery:
 
 
 class AIOModelSelect(BaseModelSelect[TVAIOModel], TQuery, ModelSelect):
+    _cached = False
+    _cache_ttl: float | None = None
+
     def __aiter__(self) -> AsyncIterator[TVAIOModel]:
         return self.manager.run(self).__aiter__()  # type: ignore[return-value]
 
@@ -435,6 +698,53 @@ class AIOModelSelect(BaseModelSelect[TVAIOModel], TQuery, ModelSelect):
             )
         return res
 
+    def defer(self, *fields: Field) -> Self:
+        """Exclude the given fields from the selection (load them later with `AIOModel.load`)."""
+        excluded = {id(field) for field in fields}
+        return self.select(*(node for node in self._returning or () if id(node) not in excluded))
+
+    def only(self, *fields: Field) -> Self:
+        """Select the given fields only (and the primary key)."""
+        selected = {id(field) for field in fields}
+        pks = [pk for pk in self.model._meta.get_primary_keys() if id(pk) not in selected]
+        return self.select(*pks, *fields)
+
+    def cached(self, ttl: float | None = None) -> Self:
+        """Take the results from the manager's results cache (for the given number of seconds).
+
+        The cached results are invalidated by writes to the query's tables.
+        """
+        qs = self.clone()
+        qs._cached = True
+        qs._cache_ttl = ttl
+        return qs
+
+    def seek(self, after: Any = None, *, by: Sequence[Node], size: int = 100) -> Self:
+        """Get a page of results after the given row (keyset pagination).
+
+        The row is a model instance, a mapping or a sequence of the ordering values.
+        """
+        orderings = seek_orderings(by)
+        qs = self.order_by(*orderings).limit(size)
+        if after is not None:
+            qs = qs.where(seek_condition(orderings, seek_values(orderings, after)))
+        return qs
+
+    async def seek_iter(self, *, by: Sequence[Node], size: int = 100) -> AsyncIterator[TVAIOModel]:
+        """Iterate through results by pages with keyset pagination."""
+        orderings = seek_orderings(by)
+        get_values = values_getter(self, orderings)
+        after = None
+        while True:
+            page = await self.seek(after, by=orderings, size=size)
+            for row in page:
+                yield row
+
+            if len(page) < size:
+                break
+
+            after = get_values(page[-1])
+
     if TYPE_CHECKING:
         _returning: tuple[ColumnBase, ...] | None
 
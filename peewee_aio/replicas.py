@@ -0,0 +1,223 @@
+"""Route reads to replicas and check their health."""
+
+from __future__ import annotations
+
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from itertools import count
+from math import inf
+from time import monotonic, perf_counter
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional  # py39
+
+from aio_databases.database import ConnectionContext
+from aio_databases.url import redact_url
+from peewee import SelectBase, logger  # type: ignore[]
+
+from .utils import with_timeout
+
+if TYPE_CHECKING:
+    from contextlib import AbstractAsyncContextManager
+
+    from aio_databases.backends import ABCConnection, ABCDatabaseBackend
+
+    from .manager import Manager
+
+# Fetch methods which may be routed to replicas
+READ_METHODS = frozenset(("fetchall", "fetchmany", "fetchone", "fetchval", "iterate", "stream"))
+
+POLICIES = frozenset(("round_robin", "least_latency"))
+
+# Weight of the last measurement in the replicas latency
+LATENCY_ALPHA = 0.2
+
+PRIMARY: AbstractAsyncContextManager = nullcontext()
+
+# Replication lag of a Postgres standby (0 when all received WAL is replayed)
+PG_LAG = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN NULL "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaState:
+    """A replica backend, its health and statistics.
+
+    - `latency`: a moving average of the probes and queries durations (seconds)
+    - `lag`: the replication lag measured by the last probe (seconds, Postgres only)
+    - `healthy`: unhealthy replicas are skipped until a successful probe
+    """
+
+    __slots__ = ("backend", "checked", "error", "errors", "healthy", "lag", "latency", "queries")
+
+    def __init__(self, backend: ABCDatabaseBackend):
+        self.backend = backend
+        self.healthy = True
+        self.latency: Optional[float] = None
+        self.lag: Optional[float] = None
+        self.checked: Optional[float] = None
+        self.error: Optional[str] = None
+        self.queries = self.errors = 0
+
+    def __repr__(self):
+        status = "healthy" if self.healthy else f"unhealthy ({self.error})"
+        return f"<ReplicaState {self.name} {status}>"
+
+    @property
+    def name(self) -> str:
+        url = self.backend.url
+        return redact_url(url).geturl() if url.password else url.geturl()
+
+    def observe(self, duration: float):
+        """Update the moving average of the latency (in seconds)."""
+        latency = self.latency
+        self.latency = (
+            duration if latency is None else latency + LATENCY_ALPHA * (duration - latency)
+        )
+
+    def fail(self, error: str):
+        """Drop the replica from the rotation."""
+        if self.healthy:
+            logger.warning("Replica %s is unhealthy: %s", self.name, error)
+        self.healthy = False
+        self.error = error
+
+    async def check(self, *, timeout: float = 5.0, max_lag: Optional[float] = None):
+        """Probe the replica, measure its latency and replication lag."""
+        start = perf_counter()
+        self.checked = monotonic()
+        try:
+            lag = await with_timeout(self.probe(), timeout)
+        except Exception as exc:  # noqa: BLE001
+            self.errors += 1
+            self.fail(repr(exc))
+            return
+
+        self.observe(perf_counter() - start)
+        self.lag = lag
+        if max_lag is not None and lag is not None and lag > max_lag:
+            self.fail(f"replication lag {lag:.3f}s")
+
+        else:
+            if not self.healthy:
+                logger.info("Replica %s is healthy", self.name)
+            self.healthy = True
+            self.error = None
+
+    async def probe(self) -> Optional[float]:
+        """Run a query on a new connection and get the replication lag (if supported)."""
+        backend = self.backend
+        async with ConnectionContext(backend, read_only=True) as conn:
+            if backend.db_type == "postgresql":
+                lag = await conn.fetchval(PG_LAG)
+                return None if lag is None else float(lag)
+
+            await conn.fetchval("SELECT 1")
+            return None
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "latency": self.latency,
+            "lag": self.lag,
+            "queries": self.queries,
+            "errors": self.errors,
+            "error": self.error,
+        }
+
+
+class ReplicaRouter:
+    """Send plain SELECT queries outside of transactions to replicas.
+
+    Reads stay on the primary for `window` seconds after a write in the same task
+    (read-your-writes). Unhealthy replicas are skipped, reads fail over to the primary when
+    there are no healthy replicas.
+    """
+
+    __slots__ = ("counter", "last_write", "policy", "primary", "replicas", "window")
+
+    def __init__(self, manager: Manager, *, policy: str = "round_robin", window: float = 1.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy: {policy!r}")
+
+        if not manager.replicas:
+            raise ValueError("Routing requires replicas")
+
+        self.policy = policy
+        self.window = window
+        self.primary = manager.backend
+        self.replicas = manager.replicas
+        self.counter = count()
+        self.last_write: ContextVar[float] = ContextVar(f"last_write_{id(self)}", default=-inf)
+
+    def route(
+        self, method: str, query: Any, conn: Optional[ABCConnection]
+    ) -> AbstractAsyncContextManager:
+        """Get a connection context for the query (the current connection for the primary)."""
+        if method not in READ_METHODS or not is_read(query):
+            self.last_write.set(monotonic())
+            return PRIMARY
+
+        if conn is not None and (conn.transactions or conn.backend is not self.primary):
+            return PRIMARY
+
+        if monotonic() - self.last_write.get() < self.window:
+            return PRIMARY
+
+        state = self.choose()
+        if state is None:
+            return PRIMARY
+
+        return self.connection(state)
+
+    def choose(self) -> Optional[ReplicaState]:
+        """Choose a healthy replica."""
+        replicas = [state for state in self.replicas if state.healthy]
+        if not replicas:
+            return None
+
+        if self.policy == "least_latency":
+            return min(replicas, key=lambda state: state.latency or 0.0)
+
+        return replicas[next(self.counter) % len(replicas)]
+
+    @asynccontextmanager
+    async def connection(self, state: ReplicaState) -> AsyncIterator[Optional[ABCConnection]]:
+        """Run a query on a new connection to the replica and measure its latency.
+
+        When the replica is not available, the replica is dropped from the rotation and the
+        query runs on the current connection (the primary).
+        """
+        async with AsyncExitStack() as stack:
+            try:
+                conn = await stack.enter_async_context(
+                    ConnectionContext(state.backend, read_only=True)
+                )
+            except Exception as exc:  # noqa: BLE001
+                state.errors += 1
+                state.fail(repr(exc))
+                conn = None
+
+            if conn is None:
+                yield None
+                return
+
+            start = perf_counter()
+            state.queries += 1
+            try:
+                yield conn
+
+            except Exception:
+                state.errors += 1
+                raise
+
+            state.observe(perf_counter() - start)
+
+
+def is_read(query: Any) -> bool:
+    """Check that the query is a plain SELECT."""
+    if isinstance(query, str):
+        return query.lstrip()[:6].upper() == "SELECT"
+
+    return isinstance(query, SelectBase) and not getattr(query, "_for_update", None)
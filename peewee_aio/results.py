@@ -0,0 +1,237 @@
+"""Cache query results and invalidate them by tables."""
+
+from __future__ import annotations
+
+import pickle
+from abc import ABC, abstractmethod
+from hashlib import blake2b
+from inspect import isclass
+from math import ceil
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Sequence, Union  # py39
+
+from aio_databases.record import Record
+from peewee import Field, Model, Node, Table
+
+from .cache import LRUCache
+
+if TYPE_CHECKING:
+    from peewee import BaseQuery
+
+# Fetch methods which results may be cached
+CACHED_METHODS = frozenset(("fetchall", "fetchmany", "fetchone", "fetchval"))
+
+
+class ResultCache(ABC):
+    """A base class for results caches.
+
+    Entries are stored with a stamp (versions of the query's tables). Writes increase the
+    versions, so the outdated entries are not used anymore.
+    """
+
+    def __init__(self, *, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self.hits = self.misses = 0
+
+    @abstractmethod
+    async def stamp(self, tags: Iterable[str]) -> tuple:
+        """Get the current versions of the given tags."""
+
+    @abstractmethod
+    async def get(self, key: str, stamp: tuple) -> Optional[tuple]:
+        """Get a cached entry or None."""
+
+    @abstractmethod
+    async def set(self, key: str, stamp: tuple, value: tuple, *, ttl: Optional[float] = None):
+        """Store an entry."""
+
+    @abstractmethod
+    async def invalidate(self, tags: Iterable[str]):
+        """Invalidate entries for the given tags."""
+
+
+class MemoryCache(ResultCache):
+    """An in-process LRU cache with expiration."""
+
+    def __init__(self, maxsize: int = 1024, *, ttl: Optional[float] = None):
+        super().__init__(ttl=ttl)
+        self.entries: LRUCache[tuple[str, tuple], tuple[Optional[float], tuple]] = LRUCache(maxsize)
+        self.versions: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def clear(self):
+        """Drop the entries and reset the counters."""
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    async def stamp(self, tags: Iterable[str]) -> tuple:
+        versions = self.versions
+        return tuple(versions.get(tag, 0) for tag in sorted(tags))
+
+    async def get(self, key: str, stamp: tuple) -> Optional[tuple]:
+        entry = self.entries.get((key, stamp))
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires is not None and expires < monotonic():
+            del self.entries[(key, stamp)]
+            return None
+
+        return value
+
+    async def set(self, key: str, stamp: tuple, value: tuple, *, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        self.entries[(key, stamp)] = (None if ttl is None else monotonic() + ttl, value)
+
+    async def invalidate(self, tags: Iterable[str]):
+        versions = self.versions
+        for tag in tags:
+            versions[tag] = versions.get(tag, 0) + 1
+
+
+class LocalKV:
+    """An in-process key/value store (a stand-in for Redis-like clients)."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.data: LRUCache[str, tuple[Optional[float], bytes]] = LRUCache(maxsize)
+        # Counters are not evicted
+        self.counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        if key in self.counters:
+            return self.counters[key]
+
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires is not None and expires < monotonic():
+            del self.data[key]
+            return None
+
+        return value
+
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None):
+        self.data[key] = (None if ex is None else monotonic() + ex, value)
+
+    async def incr(self, key: str) -> int:
+        res = self.counters[key] = self.counters.get(key, 0) + 1
+        return res
+
+
+class KVCache(ResultCache):
+    """Store results in a key/value store.
+
+    The client has to support async `get(key)`, `set(key, value, ex=seconds)` and `incr(key)`
+    (e.g. `redis.asyncio.Redis`). The versions of tables are kept in the store as well, so the
+    invalidation is shared between processes.
+    """
+
+    def __init__(
+        self, client: Any = None, *, prefix: str = "peewee-aio", ttl: Optional[float] = None
+    ):
+        super().__init__(ttl=ttl)
+        self.client = LocalKV() if client is None else client
+        self.prefix = prefix
+
+    async def stamp(self, tags: Iterable[str]) -> tuple:
+        client, prefix = self.client, self.prefix
+        versions = [await client.get(f"{prefix}:tag:{tag}") for tag in sorted(tags)]
+        return tuple(int(version or 0) for version in versions)
+
+    def key(self, key: str, stamp: tuple) -> str:
+        return f"{self.prefix}:{key}:{'.'.join(map(str, stamp))}"
+
+    async def get(self, key: str, stamp: tuple) -> Optional[tuple]:
+        data = await self.client.get(self.key(key, stamp))
+        if data is None:
+            return None
+
+        # The store is trusted, it contains the data written by the cache only
+        return pickle.loads(data)  # noqa: S301
+
+    async def set(self, key: str, stamp: tuple, value: tuple, *, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        await self.client.set(
+            self.key(key, stamp), pickle.dumps(value), ex=None if ttl is None else ceil(ttl)
+        )
+
+    async def invalidate(self, tags: Iterable[str]):
+        client, prefix = self.client, self.prefix
+        for tag in tags:
+            await client.incr(f"{prefix}:tag:{tag}")
+
+
+def cache_key(method: str, sql: str, params: Sequence[Any], opts: dict[str, Any]) -> str:
+    """Get a cache key for the given SQL."""
+    data = repr((method, sql, tuple(params), sorted(opts.items())))
+    return blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+def table_tag(table: Union[Table, type[Model]]) -> str:
+    """Get a tag of the given table or model."""
+    if isclass(table):
+        table = table._meta.table  # type: ignore[]
+    return ".".join(table._path)  # type: ignore[]
+
+
+def query_tags(query: BaseQuery) -> set[str]:
+    """Get the tables which are used in the given query."""
+    tags: set[str] = set()
+    seen: set[int] = set()
+    stack: list[Any] = [query]
+    while stack:
+        obj = stack.pop()
+        if isclass(obj):
+            if issubclass(obj, Model):
+                tags.add(table_tag(obj))
+
+        elif isinstance(obj, Table):
+            tags.add(table_tag(obj))
+
+        elif isinstance(obj, Field):
+            stack.append(obj.model)
+
+        elif isinstance(obj, Node):
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                stack.extend(obj.__dict__.values())
+
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+
+    return tags
+
+
+def dump_result(method: str, res: Any) -> tuple:
+    """Convert the fetched result into columns and tuples of values."""
+    if method == "fetchval":
+        return ((), [(res,)])
+
+    rows = [] if res is None else [res] if method == "fetchone" else res
+    if not rows:
+        return ((), [])
+
+    return (tuple(rows[0].keys()), [tuple(row.values()) for row in rows])
+
+
+def load_result(method: str, data: tuple) -> Any:
+    """Restore the fetched result from columns and tuples of values."""
+    columns, rows = data
+    if method == "fetchval":
+        return rows[0][0]
+
+    description = [[name] for name in columns]
+    records = [Record(values, description) for values in rows]
+    if method == "fetchone":
+        return records[0] if records else None
+
+    return records
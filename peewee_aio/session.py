@@ -0,0 +1,133 @@
+"""Keep loaded instances in an identity map and flush the changes."""
+
+from __future__ import annotations
+
+from contextvars import ContextVar
+from inspect import iscoroutinefunction
+from typing import TYPE_CHECKING, Any, Optional  # py39
+
+from peewee import Model
+
+if TYPE_CHECKING:
+    from .manager import Manager
+
+
+class Session:
+    """A unit of work.
+
+    Instances loaded through the manager are kept by (model, primary key), so the same row is
+    represented by the same instance. Changed instances are updated on flush.
+    """
+
+    __slots__ = ("identity", "manager")
+
+    def __init__(self, manager: Manager):
+        self.manager = manager
+        self.identity: dict[tuple[type[Model], Any], Model] = {}
+
+    def __contains__(self, inst: Model) -> bool:
+        return self.identity.get((type(inst), identity_key(inst))) is inst
+
+    def get(self, model_cls: type[Model], pk: Any, *fields: str) -> Optional[Model]:
+        """Get an instance from the identity map (partially loaded instances are skipped).
+
+        Deferred fields are required only when they are given.
+        """
+        inst = self.identity.get((model_cls, pk))
+        if inst is None:
+            return None
+
+        data = inst.__data__  # type: ignore[]
+        names = fields or [
+            field.name
+            for field in model_cls._meta.sorted_fields  # type: ignore[]
+            if not getattr(field, "deferred", False)
+        ]
+        if any(name not in data for name in names):
+            return None
+        return inst
+
+    def add(self, inst: Any) -> Any:
+        """Track the given instance and return the instance which represents its row."""
+        if not isinstance(inst, Model):
+            return inst
+
+        model_cls = type(inst)
+        if getattr(model_cls, "_manager", None) is not self.manager:
+            return inst
+
+        pk = identity_key(inst)
+        if pk is None:
+            return inst
+
+        tracked = self.identity.setdefault((model_cls, pk), inst)
+        if tracked is not inst:
+            # Merge the fields which are missing on the tracked instance (partial selects)
+            data = tracked.__data__  # type: ignore[]
+            for name, value in inst.__data__.items():  # type: ignore[]
+                if name not in data:
+                    data[name] = value
+
+            rel = tracked.__rel__  # type: ignore[]
+            for name, value in inst.__rel__.items():  # type: ignore[]
+                rel.setdefault(name, value)
+
+        return tracked
+
+    def discard(self, inst: Model):
+        """Stop tracking the given instance."""
+        self.identity.pop((type(inst), identity_key(inst)), None)
+
+    @property
+    def dirty(self) -> list[Model]:
+        """Get the changed instances."""
+        return [inst for inst in self.identity.values() if inst._dirty]  # type: ignore[]
+
+    async def flush(self) -> int:
+        """Update the changed instances (with a query per model and a set of fields)."""
+        groups: dict[tuple[type[Model], frozenset[str]], list[Model]] = {}
+        for inst in self.dirty:
+            model_cls = type(inst)
+            pks = {field.name for field in model_cls._meta.get_primary_keys()}  # type: ignore[]
+            names = frozenset(inst._dirty) - pks  # type: ignore[]
+            if names:
+                groups.setdefault((model_cls, names), []).append(inst)
+            else:
+                inst._dirty.clear()  # type: ignore[]
+
+        if not groups:
+            return 0
+
+        res = 0
+        manager = self.manager
+        async with manager.transaction():
+            for (model_cls, names), instances in groups.items():
+                fields = sorted(names)
+                # AIO models update the instances with a single query (single primary keys only)
+                composite_key = model_cls._meta.composite_key  # type: ignore[]
+                if iscoroutinefunction(model_cls.bulk_update) and not composite_key:
+                    res += await model_cls.bulk_update(instances, fields)
+                else:
+                    for inst in instances:
+                        await manager.save(inst, only=fields)
+                    res += len(instances)
+
+                for inst in instances:
+                    inst._dirty.clear()  # type: ignore[]
+
+        return res
+
+
+def identity_key(inst: Model) -> Any:
+    """Get the primary key of the instance (composite keys are taken from the raw values, so the
+    related instances are not loaded).
+    """
+    meta = inst._meta  # type: ignore[]
+    if meta.composite_key:
+        data = inst.__data__  # type: ignore[]
+        values = tuple(data.get(name) for name in meta.primary_key.field_names)
+        return None if None in values else values
+    return inst._pk  # type: ignore[]
+
+
+current_session: ContextVar[Optional[Session]] = ContextVar("current_session", default=None)
@@ -0,0 +1,786 @@
+"""Route models operations to shards (several managers)."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import cmp_to_key
+from heapq import heapify, heappop, heapreplace, merge
+from itertools import chain, islice
+from typing import (  # py39
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Hashable,
+    Iterator,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+import peewee as pw
+from aio_databases.database import current_conn
+from peewee import (
+    OP,
+    ROW,
+    Expression,
+    Field,
+    Insert,
+    ModelSelect,
+    Node,
+    Query,
+    SelectBase,
+    sort_models,  # type: ignore[]
+)
+from peewee import Model as PWModel
+
+from .columns import to_columns
+from .manager import Manager, RunWrapper, populate_prefetch, prefetch_chunks
+from .session import Session, current_session
+from .utils import create_event, gather, seek_orderings, values_getter
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+    from aio_databases.backends import ABCConnection, ABCTransaction
+
+TVModel = TypeVar("TVModel", bound=PWModel)
+
+MISSING = object()
+
+
+class ShardedManager:
+    """Route models operations to shards by the values of the models shard keys.
+
+    The `key` function maps a shard key value to a shard name. Queries which are not filtered
+    by the shard key (`field == value` or `field.in_(values)`) run on all the shards
+    concurrently, their results are merged (merge-sorted for ordered queries as the database
+    orders NULLs, with `limit` and `offset` applied after the merge). Aggregates are not merged
+    across the shards, except `count()`. Raw SQL and compiled queries run on all the shards.
+    """
+
+    def __init__(self, shards: Mapping[Hashable, Manager], key: Callable[[Any], Hashable]):
+        if not shards:
+            raise ValueError("Shards are required")
+
+        self.shards = dict(shards)
+        self.key = key
+        self.keys: dict[type[PWModel], Field] = {}
+        self.pw_database = next(iter(self.shards.values())).pw_database
+
+        # Postgres orders NULLs as the largest values, SQLite and MySQL as the smallest ones
+        self.nulls_large = next(iter(self.shards.values())).backend.db_type == "postgresql"
+
+        self.current_transaction: ContextVar[Optional[ShardsTransaction]] = ContextVar(
+            f"shards_transaction_{id(self)}", default=None
+        )
+
+    def __repr__(self):
+        return f"<ShardedManager {', '.join(map(str, self.shards))}>"
+
+    def __iter__(self):
+        """Iterate through registered models."""
+        return iter(sort_models(self.keys))
+
+    def register(
+        self, model_cls: type[TVModel], *, key: Union[str, Field, None] = None
+    ) -> type[TVModel]:
+        """Register a model with the sharded manager.
+
+        :param key: The shard key field (the model `Meta.shard_key` or the primary key by default)
+        """
+        meta = model_cls._meta  # type: ignore[]
+        key = key or getattr(meta, "shard_key", None) or meta.primary_key  # type: ignore[]
+        field = meta.fields[key] if isinstance(key, str) else key
+        if not isinstance(field, Field) or field.model is not model_cls:
+            raise ValueError(f"Invalid shard key for {model_cls.__name__}: {key!r}")
+
+        model_cls._manager = self  # type: ignore[]
+        meta.database = self.pw_database
+        self.keys[model_cls] = field
+        return model_cls
+
+    async def connect(self):
+        await gather(*(shard.connect() for shard in self.shards.values()))
+
+    async def disconnect(self):
+        await gather(*(shard.disconnect() for shard in self.shards.values()))
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.disconnect()
+
+    @asynccontextmanager
+    async def connection(self, shard: Manager) -> AsyncIterator[ABCConnection]:
+        """Get a connection to the shard.
+
+        It is the shard's transaction connection inside `transaction()`, the current connection
+        when it belongs to the shard or a new one.
+        """
+        trans = self.current_transaction.get()
+        if trans is not None:
+            yield await trans.connection(shard)
+            return
+
+        conn = current_conn.get()
+        if conn is not None and conn.is_ready and conn.backend is shard.backend:
+            yield conn
+            return
+
+        conn = shard.backend.connection()
+        await conn.acquire()
+        try:
+            yield conn
+        finally:
+            await conn.release()
+
+    async def on_shard(self, shard: Manager, method: Callable, *args, **kwargs) -> Any:
+        """Call the shard's method on a connection to the shard."""
+        async with self.connection(shard) as conn:
+            with bind(conn):
+                return await method(*args, **kwargs)
+
+    @asynccontextmanager
+    async def transaction(self, **params) -> AsyncIterator[ShardsTransaction]:
+        """Run the queries in transactions on the shards they are routed to.
+
+        The transactions start on the shards lazily and finish together on exit. Every shard's
+        transaction is atomic, but the shards are committed one by one (there is no two-phase
+        commit). Nested transactions join the outer one.
+        """
+        trans = self.current_transaction.get()
+        if trans is not None:
+            yield trans
+            return
+
+        trans = ShardsTransaction(**params)
+        token = self.current_transaction.set(trans)
+        try:
+            yield trans
+
+        except BaseException:
+            await trans.finish(commit=False)
+            raise
+
+        else:
+            await trans.finish(commit=True)
+
+        finally:
+            self.current_transaction.reset(token)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[Session]:
+        """Keep loaded instances in an identity map and flush changed instances on exit."""
+        session = Session(self)  # type: ignore[arg-type]
+        token = current_session.set(session)
+        try:
+            yield session
+            await session.flush()
+        finally:
+            current_session.reset(token)
+
+    # Routing
+    # -------
+
+    def shard_for(self, value: Any) -> Manager:
+        """Get a shard for the given shard key value."""
+        return self.shards[self.key(value)]
+
+    def shard_of(self, inst: PWModel) -> Manager:
+        """Get a shard of the given model instance."""
+        field = self.keys.get(type(inst))
+        if field is None:
+            raise ValueError(f"The model is not registered: {type(inst).__name__}")
+
+        value = inst.__data__.get(field.name)
+        if value is None:
+            raise ValueError(f"The shard key is required: {field}")
+        return self.shard_for(value)
+
+    def route(self, query: Any) -> list[tuple[Manager, Any]]:
+        """Get the shards (and the queries to run on them) for the given query."""
+        if not isinstance(query, Query):
+            return [(shard, query) for shard in self.shards.values()]
+
+        field = self.keys.get(getattr(query, "model", None))  # type: ignore[arg-type]
+        if field is None:
+            return [(shard, query) for shard in self.shards.values()]
+
+        if isinstance(query, Insert):
+            return self.route_insert(query, field)
+
+        values = key_values(getattr(query, "_where", None), field)
+        if values is None:
+            return [(shard, query) for shard in self.shards.values()]
+
+        # An empty IN () selects nothing, any shard will do
+        names = {self.key(value) for value in values} or {next(iter(self.shards))}
+        return [(self.shards[name], query) for name in names]
+
+    def route_insert(self, query: Insert, field: Field) -> list[tuple[Manager, Query]]:
+        """Split the inserted rows by shards."""
+        rows = query._insert  # type: ignore[]
+        if isinstance(rows, Mapping):
+            return [(self.shard_for(row_value(rows, field, None)), query)]
+
+        if isinstance(rows, Node):
+            raise TypeError("INSERT ... SELECT queries can not be routed to shards")
+
+        columns = query._columns  # type: ignore[]
+        groups: dict[Hashable, list] = {}
+        for row in rows:
+            groups.setdefault(self.key(row_value(row, field, columns)), []).append(row)
+
+        res: list[tuple[Manager, Query]] = []
+        for name, group in groups.items():
+            qs = query.clone()
+            qs._insert = group  # type: ignore[]
+            res.append((self.shards[name], qs))
+        return res
+
+    # Queries
+    # -------
+
+    def run(self, query: Any) -> Any:
+        """Run the given Peewee ORM Query."""
+        if isinstance(query, SelectBase) or getattr(query, "_returning", None):
+            return RunWrapper(self, query)  # type: ignore[arg-type]
+
+        return self.execute(query)
+
+    async def execute(self, query: Any) -> Any:
+        """Execute the query on its shards (the number of rows is summed for several shards)."""
+        routes = self.route(query)
+        if len(routes) == 1:
+            shard, qs = routes[0]
+            return await self.on_shard(shard, shard.execute, qs)
+
+        res = await gather(*(self.on_shard(shard, shard.execute, qs) for shard, qs in routes))
+        return sum(count or 0 for count in res)
+
+    async def fetchall(self, query: Any) -> list[Any]:
+        """Fetch all the rows from the query shards and merge them."""
+        routes = self.route(query)
+        if len(routes) == 1:
+            shard, qs = routes[0]
+            return await self.on_shard(shard, shard.fetchall, qs)
+
+        if not isinstance(query, SelectBase):
+            res = await gather(*(self.on_shard(shard, shard.fetchall, qs) for shard, qs in routes))
+            return list(chain.from_iterable(res))
+
+        qs, start, stop, strip = shard_page(query)
+        res = await gather(*(self.on_shard(shard, shard.fetchall, qs) for shard, _ in routes))
+        rows = islice(merge_rows(qs, res, nulls_large=self.nulls_large), start, stop)
+        return list(rows if strip is None else map(strip, rows))
+
+    async def fetchmany(self, size: int, query: Any) -> list[Any]:
+        limit = query._limit  # type: ignore[]
+        return await self.fetchall(query.limit(size if limit is None else min(size, limit)))
+
+    async def fetchone(self, query: Any) -> Any:
+        rows = await self.fetchall(query.limit(1))
+        return rows[0] if rows else None
+
+    async def fetchval(self, query: Any) -> Any:
+        """Fetch a value (the query has to be routed to a single shard)."""
+        routes = self.route(query)
+        if len(routes) > 1:
+            raise ValueError("Values can not be merged across shards, filter by the shard key")
+
+        shard, qs = routes[0]
+        return await self.on_shard(shard, shard.fetchval, qs)
+
+    async def iterate(self, query: Any) -> AsyncIterator:
+        """Iterate through the query results (the results are merged for several shards)."""
+        routes = self.route(query)
+        if len(routes) > 1:
+            for row in await self.fetchall(query):
+                yield row
+            return
+
+        shard, qs = routes[0]
+        async with self.connection(shard) as conn:
+            async for row in bound(conn, shard.iterate(qs)):
+                yield row
+
+    async def stream(self, query: Any, *, batch_size: int = 1000) -> AsyncIterator:
+        """Iterate through the query results fetched by batches.
+
+        The shards are streamed together (a connection per shard), the rows of ordered queries
+        are merge-sorted.
+        """
+        routes = self.route(query)
+        if len(routes) == 1:
+            shard, qs = routes[0]
+            async with (
+                self.connection(shard) as conn,
+                aclosing(bound(conn, shard.stream(qs, batch_size=batch_size))) as rows,
+            ):
+                async for row in rows:
+                    yield row
+            return
+
+        qs, start, stop, strip = shard_page(query)
+        async with AsyncExitStack() as stack:
+            streams = []
+            for shard, _ in routes:
+                conn = await stack.enter_async_context(self.connection(shard))
+                stream = bound(conn, shard.stream(qs, batch_size=batch_size))
+                stack.push_async_callback(stream.aclose)
+                streams.append(stream)
+
+            key = (
+                sort_key(qs, nulls_large=self.nulls_large)
+                if getattr(qs, "_order_by", None)
+                else None
+            )
+            idx = 0
+            rows = await stack.enter_async_context(aclosing(merge_streams(streams, key)))
+            async for row in rows:
+                if stop is not None and idx >= stop:
+                    break
+                if idx >= start:
+                    yield row if strip is None else strip(row)
+                idx += 1
+
+    async def fetch_columns(self, query: Any, *, numpy: bool = True) -> dict[str, Sequence[Any]]:
+        """Fetch the query results as columns (name -> values)."""
+        routes = self.route(query)
+        if len(routes) == 1:
+            shard, qs = routes[0]
+            return await self.on_shard(shard, shard.fetch_columns, qs, numpy=numpy)
+
+        if not isinstance(query, SelectBase):
+            raise TypeError("Raw SQL results can not be merged into columns across shards")
+
+        rows = await self.fetchall(query.dicts())  # type: ignore[attr-defined]
+        if not rows:
+            return {}
+
+        names = list(rows[0])
+        values = [tuple(row.values()) for row in rows]
+        return to_columns(values, names, [None] * len(names), numpy=numpy)
+
+    async def count(self, query: Any, *, clear_limit: bool = False) -> int:
+        """Count the query rows on its shards."""
+        limit, offset = query._limit, query._offset or 0  # type: ignore[]
+        counts = await gather(
+            *(
+                self.on_shard(shard, shard.count, qs, clear_limit=True)
+                for shard, qs in self.route(query)
+            )
+        )
+        total = sum(counts)
+        if clear_limit:
+            return total
+
+        total = max(total - offset, 0)
+        return total if limit is None else min(total, limit)
+
+    async def prefetch(self, sq: Query, *subqueries, **kwargs) -> Any:
+        """Prefetch results for the given query and subqueries (across the shards)."""
+        if not subqueries:
+            return await self.fetchall(sq)
+
+        prefetch_type = kwargs.pop("prefetch_type", pw.PREFETCH_TYPE.WHERE)
+        fixed_queries = pw.prefetch_add_subquery(sq, subqueries, prefetch_type)  # type: ignore[missing-attribute]
+        fixed_queries = fixed_queries[::-1]
+        results = await gather(*(self.fetchall(pq.query) for pq in fixed_queries))
+        return populate_prefetch(fixed_queries, results)
+
+    async def prefetch_iter(
+        self, sq: ModelSelect, *subqueries, chunk_size: int = 1000, **kwargs
+    ) -> AsyncIterator:
+        """Iterate through the given query by chunks and prefetch the subqueries per chunk.
+
+        Unordered queries are paginated by the primary key when it is the shard key (primary
+        keys of other models may repeat across the shards), otherwise they are ordered by the
+        primary key and paginated with limit/offset.
+        """
+        pk = sq.model._meta.primary_key  # type: ignore[]
+        unordered = not (
+            sq._order_by or sq._limit is not None or sq._offset is not None  # type: ignore[]
+        )
+        keyset = unordered and isinstance(pk, Field) and self.keys.get(sq.model) is pk
+        if unordered and not keyset and isinstance(pk, Field):
+            sq = sq.order_by(pk)
+
+        chunks = prefetch_chunks(
+            self.fetchall,
+            lambda queries: gather(*map(self.fetchall, queries)),
+            sq,
+            subqueries,
+            chunk_size=chunk_size,
+            keyset=keyset,
+            prefetch_type=kwargs.pop("prefetch_type", pw.PREFETCH_TYPE.WHERE),
+        )
+        async for obj in chunks:
+            yield obj
+
+    # Model methods
+    # -------------
+
+    async def create_tables(self, *models_cls: type[PWModel], **opts):
+        """Create tables for the given models or all registered on every shard."""
+        models_cls = models_cls or tuple(self.keys)
+        await gather(
+            *(
+                self.on_shard(shard, shard.create_tables, *models_cls, **opts)
+                for shard in self.shards.values()
+            )
+        )
+
+    async def drop_tables(self, *models_cls: type[PWModel], **opts):
+        """Drop tables for the given models or all registered on every shard."""
+        models_cls = models_cls or tuple(self.keys)
+        await gather(
+            *(
+                self.on_shard(shard, shard.drop_tables, *models_cls, **opts)
+                for shard in self.shards.values()
+            )
+        )
+
+    async def invalidate(self, *models_cls: type[PWModel]):
+        await gather(*(shard.invalidate(*models_cls) for shard in self.shards.values()))
+
+    async def get_or_none(
+        self, model_cls: type[TVModel], *args: Node, **kwargs
+    ) -> Optional[TVModel]:
+        query: ModelSelect = model_cls.select()  # type: ignore[]
+        if kwargs:
+            query = query.filter(**kwargs)
+
+        if args:
+            query = query.where(*args)  # type: ignore[]
+
+        return await self.fetchone(query)
+
+    async def get(self, model_cls: type[TVModel], *args: Node, **kwargs) -> TVModel:
+        res = await self.get_or_none(model_cls, *args, **kwargs)
+        if res is None:
+            raise model_cls.DoesNotExist  # type: ignore[]
+        return res
+
+    async def get_by_id(self, model_cls: type[TVModel], pk) -> TVModel:
+        session = current_session.get()
+        if session is not None:
+            inst = session.get(model_cls, pk)
+            if inst is not None:
+                return inst  # type: ignore[]
+
+        return await self.get(model_cls, model_cls._meta.primary_key == pk)  # type: ignore[]
+
+    async def set_by_id(self, model_cls: type[PWModel], key, value) -> Any:
+        qs = (
+            model_cls.insert(value)
+            if key is None
+            else model_cls.update(value).where(model_cls._meta.primary_key == key)  # type: ignore[]
+        )
+        return await self.execute(qs)
+
+    async def delete_by_id(self, model_cls: type[PWModel], pk):
+        return await self.execute(
+            model_cls.delete().where(model_cls._meta.primary_key == pk),  # type: ignore[]
+        )
+
+    async def create(self, model_cls: type[TVModel], **values) -> TVModel:
+        inst = model_cls(**values)
+        return await self.save(inst, force_insert=True)
+
+    async def save(self, inst: TVModel, **kwargs) -> TVModel:
+        """Save the instance on its shard."""
+        shard = self.shard_of(inst)
+        return await self.on_shard(shard, shard.save, inst, **kwargs)
+
+    async def delete_instance(self, inst: PWModel, **kwargs) -> Any:
+        """Delete the instance from its shard."""
+        shard = self.shard_of(inst)
+        return await self.on_shard(shard, shard.delete_instance, inst, **kwargs)
+
+
+class ShardsTransaction:
+    """Transactions which start on the shards lazily and finish together."""
+
+    __slots__ = ("connections", "params", "pending")
+
+    def __init__(self, **params):
+        self.params = params
+        self.connections: dict[Manager, tuple[ABCConnection, ABCTransaction]] = {}
+        self.pending: dict[Manager, Any] = {}
+
+    async def connection(self, shard: Manager) -> ABCConnection:
+        """Get the connection of the shard's transaction (start the transaction on first use)."""
+        while shard not in self.connections:
+            event = self.pending.get(shard)
+            if event is not None:
+                await event.wait()
+                continue
+
+            event = self.pending[shard] = create_event()
+            try:
+                conn = shard.backend.connection()
+                await conn.acquire()
+                try:
+                    trans = conn.transaction(**self.params)
+                    await trans.start()
+                except BaseException:
+                    await conn.release()
+                    raise
+
+                self.connections[shard] = (conn, trans)
+
+            finally:
+                del self.pending[shard]
+                event.set()
+
+        return self.connections[shard][0]
+
+    async def finish(self, *, commit: bool):
+        """Commit (or rollback) the transactions and release their connections.
+
+        When a commit fails, the remaining transactions are rolled back.
+        """
+        connections, self.connections = list(self.connections.items()), {}
+        error: Optional[BaseException] = None
+        for shard, (conn, trans) in connections:
+            committed = False
+            try:
+                if commit and error is None:
+                    await trans.commit()
+                    committed = True
+                else:
+                    await trans.rollback()
+
+            except Exception as exc:  # noqa: BLE001
+                error = error or exc
+
+            finally:
+                await conn.release()
+                await shard.end_transaction(conn, commit=committed)
+
+        if error is not None:
+            raise error
+
+
+@contextmanager
+def bind(conn: ABCConnection) -> Iterator[ABCConnection]:
+    """Make the connection current (the shard managers run queries on it)."""
+    token = current_conn.set(conn)
+    try:
+        yield conn
+    finally:
+        current_conn.reset(token)
+
+
+async def bound(conn: ABCConnection, rows: AsyncIterator) -> AsyncGenerator:
+    """Iterate through the rows with the connection bound to every step."""
+    try:
+        while True:
+            with bind(conn):
+                try:
+                    row = await rows.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield row
+
+    finally:
+        with bind(conn):
+            await rows.aclose()  # type: ignore[attr-defined]
+
+
+def shard_page(query: Any) -> tuple[Any, int, Optional[int], Optional[Callable]]:
+    """Get a query for the shards, the slice of the merged rows and a rows cleaner.
+
+    Every shard returns the rows up to the end of the requested page. Ordering columns which
+    are not selected are added to the shards queries (to merge-sort the rows) and removed from
+    the merged rows.
+    """
+    if not isinstance(query, SelectBase):
+        return query, 0, None, None
+
+    limit, offset = query._limit, query._offset or 0  # type: ignore[]
+    qs, strip = select_orderings(query)
+    qs = qs.clone()
+    qs._limit = None if limit is None else limit + offset  # type: ignore[]
+    qs._offset = None  # type: ignore[]
+    return qs, offset, None if limit is None else offset + limit, strip
+
+
+def select_orderings(query: Any) -> tuple[Any, Optional[Callable]]:
+    """Select the ordering columns which are missing in the query results."""
+    order_by = getattr(query, "_order_by", None)
+    if not order_by:
+        return query, None
+
+    columns = query._returning
+    missing = [
+        ordering.node
+        for ordering in seek_orderings(order_by)
+        if not any(column is ordering.node for column in columns)
+    ]
+    if not missing:
+        return query, None
+
+    row_type = query._row_type
+    if not all(isinstance(node, Field) for node in missing) or row_type not in (
+        None,
+        ROW.MODEL,
+        ROW.TUPLE,
+        ROW.DICT,
+    ):
+        raise ValueError("Ordering columns have to be selected to merge the shards results")
+
+    qs = query.select_extend(*missing)
+    if row_type == ROW.TUPLE:
+        size = len(columns)
+        return qs, lambda row: row[:size]
+
+    if row_type == ROW.DICT:
+        names = [node.name for node in missing]
+
+        def strip(row: dict) -> dict:
+            for name in names:
+                row.pop(name, None)
+            return row
+
+        return qs, strip
+
+    # Model instances keep the loaded values
+    return qs, None
+
+
+def key_values(where: Optional[Node], field: Field) -> Optional[set]:
+    """Get the shard key values the condition is restricted to (None when it is not)."""
+    if not isinstance(where, Expression):
+        return None
+
+    if where.op == OP.AND:
+        lhs, rhs = key_values(where.lhs, field), key_values(where.rhs, field)
+        if lhs is None or rhs is None:
+            return rhs if lhs is None else lhs
+        return lhs & rhs
+
+    if where.op == OP.OR:
+        lhs, rhs = key_values(where.lhs, field), key_values(where.rhs, field)
+        if lhs is None or rhs is None:
+            return None
+        return lhs | rhs
+
+    return condition_values(where, field)
+
+
+def condition_values(cond: Expression, field: Field) -> Optional[set]:
+    """Get the shard key values from `field == value` or `field IN values` conditions."""
+    if cond.lhs is not field:
+        return None
+
+    if cond.op == OP.EQ and not isinstance(cond.rhs, Node):
+        return {key_value(cond.rhs)}
+
+    if cond.op == OP.IN and isinstance(cond.rhs, (list, tuple, set, frozenset)):
+        return set(map(key_value, cond.rhs))
+
+    return None
+
+
+def key_value(value: Any) -> Any:
+    """Get a shard key value (the primary key for model instances)."""
+    return value.get_id() if isinstance(value, PWModel) else value
+
+
+def row_value(row: Any, field: Field, columns: Optional[Sequence[Field]]) -> Any:
+    """Get the shard key value from the inserted row."""
+    if isinstance(row, Mapping):
+        value = row.get(field)
+        if value is None:
+            value = row.get(field.name)
+
+    elif isinstance(row, PWModel):
+        value = row.__data__.get(field.name)
+
+    else:
+        idx = next((idx for idx, col in enumerate(columns or ()) if col is field), None)
+        value = None if idx is None else row[idx]
+
+    if value is None:
+        raise ValueError(f"The shard key is required: {field}")
+    return key_value(value)
+
+
+def merge_rows(
+    query: SelectBase, results: Sequence[list[Any]], *, nulls_large: bool
+) -> Iterable[Any]:
+    """Merge the shards results (merge-sort the results of ordered queries)."""
+    order_by = getattr(query, "_order_by", None)
+    if not order_by:
+        return chain.from_iterable(results)
+
+    # Every shard result is sorted already
+    return merge(*results, key=sort_key(query, nulls_large=nulls_large))
+
+
+async def merge_streams(
+    streams: Sequence[AsyncIterator], key: Optional[Callable[[Any], Any]]
+) -> AsyncGenerator:
+    """Merge the shards streams (merge-sort the streams of ordered queries)."""
+    if key is None:
+        for stream in streams:
+            async for row in stream:
+                yield row
+        return
+
+    heap = []
+    for idx, stream in enumerate(streams):
+        row = await anext(stream, MISSING)
+        if row is not MISSING:
+            heap.append((key(row), idx, row))
+
+    heapify(heap)
+    while heap:
+        _, idx, row = heap[0]
+        yield row
+
+        row = await anext(streams[idx], MISSING)
+        if row is MISSING:
+            heappop(heap)
+        else:
+            heapreplace(heap, (key(row), idx, row))
+
+
+def sort_key(query: SelectBase, *, nulls_large: bool) -> Callable[[Any], Any]:
+    """Get a key function which sorts the query rows as the database does.
+
+    NULLs are ordered as set by `nulls=` or as the largest values (Postgres) or the smallest
+    values (SQLite, MySQL).
+    """
+    orderings = seek_orderings(query._order_by)  # type: ignore[]
+    get_values = values_getter(query, orderings)
+    columns = []
+    for ordering in orderings:
+        desc = ordering.direction.upper() == "DESC"
+        nulls = (getattr(ordering, "nulls", None) or "").upper()
+        nulls_first = nulls == "FIRST" if nulls else desc == nulls_large
+        columns.append((desc, nulls_first))
+
+    def compare(lhs: list[Any], rhs: list[Any]) -> int:
+        for (desc, nulls_first), left, right in zip(columns, lhs, rhs, strict=True):
+            if left is None or right is None:
+                if left is right:
+                    continue
+                return -1 if (left is None) == nulls_first else 1
+
+            if left != right:
+                res = -1 if left < right else 1
+                return -res if desc else res
+
+        return 0
+
+    key = cmp_to_key(compare)
+    return lambda row: key(get_values(row))
@@ -1,8 +1,24 @@
 from __future__ import annotations
 
-from typing import Optional, Union
+import asyncio
+import operator
+from contextlib import suppress
+from functools import reduce
+from typing import Any, Awaitable, Callable, Coroutine, Mapping, Optional, Sequence, Union  # py39
 
-from peewee import JOIN, Expression, Model, ModelAlias, ModelSelect
+from peewee import (
+    JOIN,
+    ROW,
+    Expression,
+    Field,
+    Model,
+    ModelAlias,
+    ModelSelect,
+    Node,
+    Ordering,
+    SelectBase,
+    Tuple,
+)
 
 TSource = Union[type[Model], ModelAlias]
 
@@ -25,3 +41,162 @@ def safe_join(  # noqa: PLR0913
                 return query
 
     return query.join(dest, join_type=join_type, on=on, src=src)
+
+
+def seek_orderings(by: Sequence[Node]) -> list[Ordering]:
+    """Normalize the keyset pagination columns."""
+    return [node if isinstance(node, Ordering) else node.asc() for node in by]  # type: ignore[]
+
+
+def seek_values(orderings: Sequence[Ordering], row: Any) -> list[Any]:
+    """Get the keyset values from a model instance, a mapping or a sequence."""
+    if isinstance(row, Model):
+        values = []
+        for ordering in orderings:
+            node = ordering.node
+            source = row
+            if isinstance(node, Field) and not isinstance(row, node.model):
+                source = next(
+                    (rel for rel in row.__rel__.values() if isinstance(rel, node.model)), row
+                )
+            values.append(source.__data__.get(node.name))
+        return values
+
+    if isinstance(row, Mapping):
+        return [row[ordering.node.name] for ordering in orderings]
+
+    values = list(row)
+    if len(values) != len(orderings):
+        raise ValueError("The keyset values do not match the ordering columns")
+    return values
+
+
+def values_getter(query: SelectBase, orderings: Sequence[Ordering]) -> Callable[[Any], list]:
+    """Get a function which returns the ordering values of the query rows."""
+    if getattr(query, "_row_type", None) not in (ROW.TUPLE, ROW.NAMED_TUPLE):
+        return lambda row: seek_values(orderings, row)
+
+    columns = query._returning  # type: ignore[]
+    positions = []
+    for ordering in orderings:
+        idx = next((idx for idx, col in enumerate(columns) if col is ordering.node), None)
+        if idx is None:
+            raise ValueError(f"Ordering columns have to be selected: {ordering.node}")
+        positions.append(idx)
+
+    return lambda row: [row[idx] for idx in positions]
+
+
+def seek_condition(orderings: Sequence[Ordering], values: Sequence[Any]) -> Expression:
+    """Build a condition to select rows after the given keyset values."""
+    directions = {ordering.direction.upper() for ordering in orderings}
+    nodes = [ordering.node for ordering in orderings]
+    if len(directions) == 1:
+        lhs, rhs = (nodes[0], values[0]) if len(nodes) == 1 else (Tuple(*nodes), Tuple(*values))
+        return lhs < rhs if directions == {"DESC"} else lhs > rhs
+
+    # Mixed directions: (a > x) OR (a = x AND b < y) OR ...
+    conditions = []
+    for idx, ordering in enumerate(orderings):
+        node, value = ordering.node, values[idx]
+        cond = node < value if ordering.direction.upper() == "DESC" else node > value
+        for prev, prev_value in zip(nodes[:idx], values[:idx], strict=True):
+            cond = (prev == prev_value) & cond
+        conditions.append(cond)
+    return reduce(operator.or_, conditions)
+
+
+def is_trio() -> bool:
+    """Check that the current async library is trio."""
+    try:
+        asyncio.current_task()
+    except RuntimeError:
+        return True
+    return False
+
+
+async def checkpoint():
+    """Let other tasks run."""
+    if is_trio():
+        import trio  # noqa: PLC0415
+
+        await trio.lowlevel.checkpoint()
+    else:
+        await asyncio.sleep(0)
+
+
+async def wait_event(event: Any, timeout: float) -> bool:
+    """Wait for the event up to the given number of seconds, return True when it is set."""
+    if is_trio():
+        import trio  # noqa: PLC0415
+
+        with trio.move_on_after(timeout):
+            await event.wait()
+
+    else:
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(event.wait(), timeout)
+
+    return event.is_set()
+
+
+async def with_timeout(aw: Awaitable, timeout: float) -> Any:
+    """Await the given awaitable, raise TimeoutError when it takes longer than the timeout."""
+    if is_trio():
+        import trio  # noqa: PLC0415
+
+        try:
+            with trio.fail_after(timeout):
+                return await aw
+        except trio.TooSlowError as exc:
+            raise TimeoutError from exc
+
+    try:
+        return await asyncio.wait_for(aw, timeout)
+    except asyncio.TimeoutError as exc:
+        raise TimeoutError from exc
+
+
+def create_event() -> Any:
+    """Create an event for the current async library."""
+    if is_trio():
+        import trio  # noqa: PLC0415
+
+        return trio.Event()
+    return asyncio.Event()
+
+
+async def gather(*aws: Awaitable) -> list[Any]:
+    """Run the given awaitables concurrently and return their results."""
+    if not is_trio():
+        return list(await asyncio.gather(*aws))
+
+    import trio  # noqa: PLC0415
+
+    results: list[Any] = [None] * len(aws)
+
+    async def run(idx: int, aw: Awaitable):
+        results[idx] = await aw
+
+    async with trio.open_nursery() as nursery:
+        for idx, aw in enumerate(aws):
+            nursery.start_soon(run, idx, aw)
+
+    return results
+
+
+# Keep references to background tasks (asyncio)
+TASKS: set[asyncio.Task] = set()
+
+
+def spawn(fn: Callable[..., Coroutine], *args: Any):
+    """Run the given coroutine function in background. It has to handle its errors."""
+    if is_trio():
+        import trio  # noqa: PLC0415
+
+        trio.lowlevel.spawn_system_task(fn, *args)
+        return
+
+    task = asyncio.get_running_loop().create_task(fn(*args))
+    TASKS.add(task)
+    task.add_done_callback(TASKS.discard)
@@ -64,3 +64,14 @@ def test_databases():
     assert manager.backend.db_type == "dummy"
     assert manager.pw_database
     assert manager.pw_database.database == ""  # noqa:
+
+
+def test_statement_cache_size():
+    from peewee_aio.drivers import ASYNCPG
+
+    manager = Manager("asyncpg://localhost", statement_cache_size=512)
+    assert manager.backend.name in ASYNCPG
+
+    for url in ("postgres://localhost", "postgresql://localhost", "aiosqlite:///:memory:"):
+        with pytest.raises(ValueError, match="not supported"):
+            Manager(url, statement_cache_size=512)
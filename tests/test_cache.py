@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import datetime as dt
+
+import pytest
+
+from peewee_aio.cache import LRUCache, SQLCache
+
+from .conftest import Comment, User
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+
+    cache["c"] = 3
+    assert list(cache) == ["a", "c"]
+    assert cache.get("b") is None
+
+
+@pytest.mark.parametrize(
+    "build",
+    [
+        lambda n: User.select().where(User.id == n),
+        lambda n: User.select().where(User.name.in_([str(n), "test"])).limit(n).offset(n),
+        lambda n: User.select(User, Comment)
+        .join(Comment)
+        .where(User.is_active == True, Comment.body == str(n))  # noqa: E712
+        .order_by(User.id.desc()),
+        lambda n: Comment.select().where(Comment.user == User(id=n)),
+        lambda n: User.update(name=str(n)).where(User.id == n),
+        lambda n: User.insert(
+            name=str(n),
+            created=dt.datetime(2000, 1, n),  # noqa: DTZ001
+            is_active=True,
+        ),
+        lambda n: User.delete().where(User.created < dt.datetime(2000, 1, n)),  # noqa: DTZ001
+    ],
+)
+def test_sql_cache(build):
+    cache = SQLCache(8)
+    for n in range(1, 5):
+        assert cache.compile(build(n)) == build(n).sql()
+
+    assert len(cache) == 1
+    assert cache.hits == 3
+    assert cache.misses == 1
+
+
+def test_sql_cache_shapes():
+    cache = SQLCache(8)
+
+    # Different structures
+    cache.compile(User.select().where(User.name == "Mickey"))
+    cache.compile(User.select().where(User.name.is_null()))
+    cache.compile(User.select().where(User.name.in_(["Mickey", "John"])))
+    cache.compile(User.select().where(User.name.in_(["Mickey"])))
+    assert len(cache) == 4
+    assert cache.hits == 0
+
+    # Inserts which use defaults are not cached
+    _, params = cache.compile(User.insert(name="Mickey"))
+    assert "Mickey" in params
+    _, params = cache.compile(User.insert(name="John"))
+    assert "John" in params
+    assert cache.hits == 0
+
+    cache.clear()
+    assert not cache
+    assert cache.misses == 0
+
+
+async def test_manager_sql_cache(manager, transaction, monkeypatch):
+    monkeypatch.setattr(manager, "sql_cache", SQLCache(8))
+
+    for name in ("Mickey", "John", "Timmy"):
+        user = await manager.create(
+            User,
+            name=name,
+            created=dt.datetime(2000, 1, 1),  # noqa: DTZ001
+            is_active=True,
+        )
+        assert user.id
+
+    for name in ("Mickey", "John", "Timmy"):
+        user = await manager.get(User, name=name)
+        assert user.name == name
+
+    assert manager.sql_cache.hits == 4
+    assert manager.sql_cache.misses == 2
@@ -1,6 +1,14 @@
 from __future__ import annotations
 
-from tests.conftest import Role, User, UserToRole
+import datetime as dt
+import io
+
+from peewee import CompositeKey
+
+from peewee_aio import AIOModel, fields
+from peewee_aio.drivers import ASYNCPG
+from peewee_aio.results import MemoryCache, table_tag
+from tests.conftest import Comment, Role, User, UserToRole
 
 
 async def test_insert(manager, transaction):
@@ -109,3 +117,74 @@ async def test_delete(manager, transaction):
     assert res is None
 
     assert await manager.run(User.select())
+
+
+async def test_session_composite_key(manager, transaction):
+    @manager.register
+    class UserComment(AIOModel):
+        id = fields.IntegerField()
+        user_id = fields.IntegerField()
+        body = fields.CharField()
+
+        class Meta:
+            table_name = "comment"
+            primary_key = CompositeKey("id", "user_id")
+
+    user = await manager.create(User, name="Mickey")
+    admin, guest = [await manager.create(Role, name=name) for name in ("admin", "guest")]
+    await manager.create(UserToRole, user=user, role=admin)
+    comment = await manager.create(Comment, body="body", user=user)
+
+    async with manager.session() as session:
+        # Composite keys are tracked without loading the relations
+        user_to_role = await manager.get(UserToRole)
+        assert user_to_role in session
+        user_to_role.role = guest
+
+        user_comment = await UserComment.get()
+        assert user_comment in session
+        user_comment.body = "updated"
+
+    assert (await manager.get(Comment, id=comment.id)).body == "updated"
+
+
+async def test_copy(manager, transaction, tmp_path, monkeypatch):
+    monkeypatch.setattr(manager, "result_cache", MemoryCache())
+    rows = [
+        {"name": "Mickey"},
+        User(name="John", is_active=False),
+        ("Timmy", dt.datetime(2000, 1, 1), True),  # noqa: DTZ001
+    ]
+    res = await manager.copy_in(User, rows, fields=["name", User.created, "is_active"])
+    assert res == 3
+
+    # The cached results are invalidated after commit
+    assert manager.pending_tags[manager.current_conn] == {table_tag(User)}
+
+    users = await manager.run(User.select().order_by(User.id))
+    assert [(user.name, user.is_active) for user in users] == [
+        ("Mickey", True),
+        ("John", False),
+        ("Timmy", True),
+    ]
+    assert users[0].created
+
+    qs = User.select(User.name).order_by(User.id)
+    output = io.BytesIO()
+    assert await manager.copy_out(qs, output) == 3
+    assert output.getvalue() == b"Mickey\nJohn\nTimmy\n"
+
+    chunks = []
+
+    async def write(data):
+        chunks.append(data)
+
+    assert await manager.copy_out(qs, write, batch_size=2) == 3
+    assert b"".join(chunks) == b"Mickey\nJohn\nTimmy\n"
+    if manager.backend.name not in ASYNCPG:
+        # asyncpg writes the chunks as the server sends them
+        assert chunks == [b"Mickey\nJohn\n", b"Timmy\n"]
+
+    path = tmp_path / "users.csv"
+    await manager.copy_out(qs, path)
+    assert path.read_bytes() == b"Mickey\nJohn\nTimmy\n"
@@ -3,6 +3,8 @@ from __future__ import annotations
 import peewee as pw
 import pytest
 
+from peewee_aio.events import QueryStats, SlowQueryLog
+from peewee_aio.utils import create_event, wait_event
 from tests.conftest import Comment, Role, User, UserToRole
 
 
@@ -156,3 +158,238 @@ async def test_union(manager, transaction):
 
     res = await manager.run(qs.limit(2))
     assert res
+
+
+async def test_shared_processors(manager, transaction):
+    from peewee_aio.manager import Constructor
+
+    user = await manager.create(User, name="Mickey")
+    await manager.run(Comment.insert(body="body", user=user))
+
+    Constructor.processors.clear()
+    for _ in range(2):
+        res = await manager.run(User.select().where(User.name == "Mickey"))
+        assert res[0].name == "Mickey"
+
+        res = await manager.run(User.select(User.id, User.name).dicts())
+        assert res == [{"id": user.id, "name": "Mickey"}]
+
+        res = await manager.run(User.select(User.name).tuples())
+        assert res == [("Mickey",)]
+
+        res = await manager.run(Comment.select(Comment, User).join(User))
+        assert res[0].body == "body"
+        assert res[0].user.name == "Mickey"
+
+    assert len(Constructor.processors) == 4
+
+    # Expressions are not shared
+    res = await manager.run(User.select(User.name.concat("!").alias("name")))
+    assert res[0].name == "Mickey!"
+    assert len(Constructor.processors) == 4
+
+
+async def test_rows_builders(manager, transaction):
+    from peewee_aio.builders import BUILDERS
+    from peewee_aio.manager import Constructor, FakeCursor
+
+    user = await manager.create(User, name="Mickey")
+    await manager.run(Comment.insert(body="body", user=user))
+    await manager.run(UserToRole.insert(user=user, role=await manager.create(Role, name="admin")))
+
+    queries = [
+        User.select(),
+        User.select(User.name, User.id.alias("user_id"), pw.fn.UPPER(User.name).alias("upper")),
+        User.select(User.name, User.name),
+        Comment.select(),
+        UserToRole.select(),
+    ]
+    for query in queries:
+        BUILDERS.clear()
+        Constructor.processors.clear()
+        rows = await manager.fetchall(query, raw=True)
+        wrapper = query._get_cursor_wrapper(FakeCursor(rows[0]))
+        wrapper.initialize()
+
+        res = Constructor(query)(rows)
+        assert len(BUILDERS) == 1
+        assert next(iter(BUILDERS.values())) is not None
+
+        expected = [wrapper.process_row(row) for row in rows]
+        assert [obj.__dict__ for obj in res] == [obj.__dict__ for obj in expected]
+        assert [type(obj) for obj in res] == [type(obj) for obj in expected]
+
+    res = await manager.fetchone(Comment.select())
+    assert res.user_id == user.id
+    assert res.created
+    assert not res.is_dirty()
+
+    # Joins and the attributes which exist on models are not supported
+    BUILDERS.clear()
+    Constructor.processors.clear()
+    await manager.fetchall(User.select(User.name.alias("save")))
+    assert list(BUILDERS.values()) == [None]
+
+
+async def test_stream(manager, transaction):
+    await manager.run(User.insert_many([{"name": f"user{n}"} for n in range(5)]))
+
+    qs = User.select().order_by(User.id)
+    res = [user async for user in manager.stream(qs, batch_size=2)]
+    assert [user.name for user in res] == [f"user{n}" for n in range(5)]
+    assert isinstance(res[0], User)
+
+    res = [row async for row in manager.stream(qs.dicts(), batch_size=5)]
+    assert [row["name"] for row in res] == [f"user{n}" for n in range(5)]
+
+    # Stop in the middle
+    stream = manager.stream(qs, batch_size=2)
+    async for user in stream:
+        assert user.name == "user0"
+        break
+    await stream.aclose()
+
+    assert await manager.count(qs) == 5
+
+
+async def test_stream_errors(manager, transaction):
+    await manager.run(User.insert_many([{"name": f"user{n}"} for n in range(3)]))
+    qs = User.select().order_by(User.id)
+    if manager.backend.db_type == "mysql":
+        # Unbuffered results lock the connection
+        with pytest.raises(RuntimeError, match="streaming"):
+            async for _ in manager.stream(qs):
+                await manager.count(qs)
+
+        assert await manager.count(qs) == 3
+
+    else:
+        assert [await manager.count(qs) async for _ in manager.stream(qs)] == [3, 3, 3]
+
+    # The original error is raised (the stream's transaction is rolled back)
+    qs = User.select(pw.SQL("missing_function()"))
+    with pytest.raises(Exception, match="missing_function"):  # noqa: PT011
+        async for _ in manager.stream(qs):
+            pass
+
+
+async def test_fetch_columns(manager, transaction):
+    from array import array
+
+    await manager.run(
+        User.insert_many([{"name": f"user{n}", "is_active": n % 2} for n in range(3)])
+    )
+    qs = User.select(User.id, User.name, User.is_active, User.created).order_by(User.id)
+
+    res = await manager.fetch_columns(qs, numpy=False)
+    assert list(res) == ["id", "name", "is_active", "created"]
+    assert isinstance(res["id"], array)
+    assert res["id"].typecode == "q"
+    assert list(res["name"]) == ["user0", "user1", "user2"]
+    assert list(res["is_active"]) == [False, True, False]
+    users = await manager.fetchall(qs)
+    assert list(res["created"]) == [user.created for user in users]
+
+    res = await manager.fetch_columns(
+        User.select(pw.fn.COUNT(User.id).alias("count")).group_by(User.is_active), numpy=False
+    )
+    assert sorted(res["count"]) == [1, 2]
+
+    # Raw SQL (quoted for the backend)
+    sql, _ = User.select(User.name).order_by(User.id).sql()
+    res = await manager.fetch_columns(sql, numpy=False)
+    assert list(res["name"]) == ["user0", "user1", "user2"]
+
+    assert await manager.fetch_columns(qs.where(User.id < 0)) == {}
+
+    np = pytest.importorskip("numpy")
+    res = await manager.fetch_columns(qs)
+    assert res["id"].dtype == np.int64
+    assert res["is_active"].dtype == np.bool_
+
+
+async def test_query_hooks(manager, transaction, monkeypatch):
+    monkeypatch.setattr(manager, "query_hooks", [])
+    events: list = []
+    manager.on_query(events.append)
+    stats = manager.on_query(QueryStats())
+
+    await manager.run(User.insert_many([{"name": f"user{n}"} for n in range(3)]))
+    for n in range(3):
+        await manager.get(User, User.name.in_([f"user{n}", *(["test"] * n)]))
+
+    assert [user.name async for user in manager.run(User.select().order_by(User.id))] == [
+        "user0",
+        "user1",
+        "user2",
+    ]
+    await manager.run(User.select())
+
+    with pytest.raises(pw.IntegrityError):
+        await manager.run(UserToRole.insert(user=1))
+
+    # Inserts with RETURNING (Postgres) fetch the rows
+    insert = "fetchall" if User.insert()._returning else "execute"
+    assert [event.method for event in events] == [
+        insert,
+        "fetchone",
+        "fetchone",
+        "fetchone",
+        "iterate",
+        "fetchall",
+        insert,
+    ]
+    insert, get, *_, select, error = events
+    assert insert.rows == 3
+    assert get.rows == 1
+    assert get.sql.startswith("SELECT")
+    assert get.params == ["user0"]
+    assert len(get.digest) == 16
+    assert get.compile_time > 0
+    assert get.execute_time > 0
+    assert get.build_time > 0
+    assert events[4].rows == 3
+    assert select.rows == 3
+    assert isinstance(error.error, pw.IntegrityError)
+
+    # Queries with different number of parameters have the same fingerprint
+    assert len(stats) == 5
+    stat = next(stat for stat in stats.top() if stat.count == 3)
+    assert "IN (...)" in stat.fingerprint
+    assert stat.rows == 3
+    assert stats.top(1)[0].total_time >= stat.total_time
+
+
+async def test_slow_queries(manager, transaction, monkeypatch, caplog):
+    logged = create_event()
+
+    class Log(SlowQueryLog):
+        __slots__ = ()
+
+        def log(self, event, plan=None):
+            super().log(event, plan)
+            if plan is not None:
+                logged.set()
+
+    slow_log = Log(manager, 0, explain=True)
+    monkeypatch.setattr(manager, "query_hooks", [slow_log])
+
+    await manager.run(User.insert(name="Mickey"))
+    await manager.get(User, User.name == "Mickey")
+    assert slow_log.count == 2
+
+    # Wait for the plan (it is fetched in background)
+    assert await wait_event(logged, 5)
+
+    insert, select = (record for record in caplog.records if record.getMessage().startswith("Slow"))
+    assert insert.sql.startswith("INSERT")
+    assert "Plan:" not in insert.getMessage()
+    assert select.sql.startswith("SELECT")
+    assert select.params_digest
+    assert "Plan:" in select.getMessage()
+    if manager.backend.db_type == "sqlite":
+        assert "SCAN" in select.getMessage()
+
+    monkeypatch.setattr(manager, "query_hooks", [SlowQueryLog(manager, 10)])
+    await manager.get(User, User.name == "Mickey")
+    assert not manager.query_hooks[0].count
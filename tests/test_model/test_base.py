@@ -6,7 +6,9 @@ import pytest
 from playhouse.test_utils import count_queries
 
 from peewee_aio import AIOModel, fields
+from peewee_aio.detector import NPlusOneError, NPlusOneWarning
 from peewee_aio.model import AIOModelSelect
+from peewee_aio.utils import gather
 
 from .conftest import DataModel
 
@@ -100,6 +102,230 @@ async def test_fk(manager, schema):
     await ParentModel.drop_table()
 
 
+async def test_batch_relations(manager, schema):
+    @manager.register
+    class ParentModel(AIOModel):
+        child = fields.ForeignKeyField(DataModel, null=True, on_delete="CASCADE")
+
+    await ParentModel.create_table()
+
+    children = [await DataModel.create(data=f"body{n}") for n in range(3)]
+    parents = [await ParentModel.create(child=child) for child in children * 2]
+    parents = await ParentModel.select().order_by(ParentModel.id)
+    parents.append(ParentModel(child=999))
+
+    async with manager.batch_relations():
+        with count_queries() as counter:
+            res = await gather(*(parent.child for parent in parents[:-1]))
+            assert res == children * 2
+
+            # Loaded instances are cached
+            assert await parents[0].child == children[0]
+
+        assert counter.count == 1
+
+        with pytest.raises(DataModel.DoesNotExist):
+            await parents[-1].child
+
+    await ParentModel.drop_table()
+
+
+async def test_batch_relations_cancel(aiolib):
+    if aiolib[0] != "asyncio":
+        pytest.skip("The test uses asyncio tasks")
+
+    import asyncio
+
+    from peewee_aio.loader import RelationsLoader
+
+    loader = RelationsLoader()
+    runs = []
+
+    async def run(values):
+        runs.append(list(values))
+
+    first = asyncio.create_task(loader.gather(("key",), 1, run))
+    second = asyncio.create_task(loader.gather(("key",), 2, run))
+    await asyncio.sleep(0)
+
+    # The batch is retried without the cancelled caller
+    first.cancel()
+    await asyncio.wait_for(second, 1)
+    assert first.cancelled()
+    assert runs == [[2]]
+    assert not loader.batches
+
+
+async def test_deferred_fields(manager, schema):
+    @manager.register
+    class Article(AIOModel):
+        id = fields.AutoField()
+        title = fields.CharField()
+        body = fields.TextField(deferred=True)
+
+    await Article.create_table()
+    await Article.insert_many([{"title": f"t{n}", "body": f"body{n}"} for n in range(3)])
+
+    qs = Article.select().order_by(Article.id)
+    assert "body" not in qs.sql()[0]
+
+    articles = await qs
+    assert [article.title for article in articles] == ["t0", "t1", "t2"]
+    assert articles[0].body is None
+
+    assert await articles[0].load() is articles[0]
+    assert articles[0].body == "body0"
+
+    # Modified fields are kept
+    articles[1].body = "changed"
+    with count_queries() as counter:
+        await Article.bulk_load(articles, Article.body)
+
+    assert counter.count == 1
+    assert [article.body for article in articles] == ["body0", "changed", "body2"]
+
+    articles = await qs.defer(Article.title)
+    assert articles[0].title is None
+    async with manager.batch_relations():
+        with count_queries() as counter:
+            await gather(*(article.load("title", "body") for article in articles))
+
+    assert counter.count == 1
+    assert [article.title for article in articles] == ["t0", "t1", "t2"]
+
+    article = await Article.select().only(Article.body).get()
+    assert article.id
+    assert article.body == "body0"
+    assert article.title is None
+
+    with pytest.raises(Article.DoesNotExist):
+        await Article(id=999).load("body")
+
+    # Deferred fields are not required by the identity map
+    async with manager.session() as session:
+        article = await Article.get_by_id(articles[0].id)
+        with count_queries() as counter:
+            assert await Article.get_by_id(article.id) is article
+
+        assert counter.count == 0
+        assert session.get(Article, article.id, "body") is None
+        await article.load()
+        assert session.get(Article, article.id, "body") is article
+
+    await Article.drop_table()
+
+
+async def test_detect_n_plus_one(manager, schema):
+    @manager.register
+    class ParentModel(AIOModel):
+        child = fields.ForeignKeyField(DataModel, null=True, on_delete="CASCADE")
+
+    await ParentModel.create_table()
+
+    children = [await DataModel.create(data=f"body{n}") for n in range(3)]
+    for child in children:
+        await ParentModel.create(child=child)
+
+    async with manager.detect_n_plus_one(threshold=3) as detector:
+        with pytest.warns(NPlusOneWarning, match="ParentModel.child is loaded one by one") as rec:
+            for parent in await ParentModel.select():
+                await parent.child
+
+        assert rec[0].filename == __file__
+        report, *other = detector.reports
+        assert not other
+        assert report.kind == "relation"
+
+        with pytest.warns(NPlusOneWarning, match="the query is repeated"):
+            for child in children:
+                await DataModel.get_by_id(child.id)
+
+        # Batched relations are fine
+        async with manager.batch_relations():
+            await gather(*(parent.child for parent in await ParentModel.select()))
+
+        assert len(detector.reports) == 2
+
+    async with manager.detect_n_plus_one(threshold=2, error=True):
+        with pytest.raises(NPlusOneError):
+            for parent in await ParentModel.select():
+                await parent.child
+
+    async with manager.detect_n_plus_one(sample_rate=0) as detector:
+        assert detector is None
+
+    await ParentModel.drop_table()
+
+
+async def test_session(manager, schema):
+    @manager.register
+    class ParentModel(AIOModel):
+        child = fields.ForeignKeyField(DataModel, null=True, on_delete="CASCADE")
+
+    await ParentModel.create_table()
+
+    children = [await DataModel.create(data=f"body{n}") for n in range(3)]
+    await ParentModel.create(child=children[0])
+
+    async with manager.session() as session:
+        instances = await DataModel.select().order_by(DataModel.id)
+        assert instances == children
+        assert instances[0] is not children[0]
+        assert instances[0] in session
+
+        with count_queries() as counter:
+            assert await DataModel.get_by_id(children[0].id) is instances[0]
+
+            parent = await ParentModel.get()
+            assert await parent.child is instances[0]
+
+            # Loaded rows are represented by the same instances
+            assert (await DataModel.get(DataModel.id == children[1].id)) is instances[1]
+
+        assert counter.count == 2
+
+        instances[0].data = "updated0"
+        instances[1].data = "updated1"
+        assert session.dirty == instances[:2]
+
+    assert [inst.data for inst in await DataModel.select().order_by(DataModel.id)] == [
+        "updated0",
+        "updated1",
+        "body2",
+    ]
+    assert not instances[0].is_dirty()
+
+    # Partially loaded instances get the fields loaded later
+    async with manager.session():
+        inst = await DataModel.select(DataModel.id).where(DataModel.id == children[1].id).get()
+        assert "data" not in inst.__data__
+        assert (await DataModel.get_by_id(children[1].id)) is inst
+        assert inst.data == "updated1"
+        assert not inst.is_dirty()
+
+    # Changes are discarded on errors
+    with pytest.raises(RuntimeError):
+        async with manager.session():
+            inst = await DataModel.get_by_id(children[2].id)
+            inst.data = "updated2"
+            raise RuntimeError
+
+    assert (await DataModel.get_by_id(children[2].id)).data == "body2"
+
+    # Dirty primary keys are not updated
+    async with manager.session() as session:
+        inst = await DataModel.get_by_id(children[2].id)
+        inst.id = children[2].id
+        inst.data = "updated2"
+        assert inst.dirty_fields == [DataModel.id, DataModel.data]
+        assert await session.flush() == 1
+        assert not inst.is_dirty()
+
+    assert (await DataModel.get_by_id(children[2].id)).data == "updated2"
+
+    await ParentModel.drop_table()
+
+
 async def test_deferred_fk(manager):
 
     @manager.register
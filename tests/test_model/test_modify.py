@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import peewee
 import pytest
+from playhouse.test_utils import count_queries
+
+from peewee_aio.bulk import update_from_values
 
 from .conftest import DataModel
 
@@ -30,6 +33,18 @@ async def test_bulk_create(schema):
     assert await DataModel.select().count() == 3
 
 
+async def test_bulk_create_batches(schema, manager, monkeypatch):
+    monkeypatch.setattr(DataModel._meta.database, "param_limit", 2)
+
+    instances = [DataModel(data=f"n{n}") for n in range(5)]
+    with count_queries() as counter:
+        await DataModel.bulk_create(instances)
+
+    # 3 inserts (2 rows per batch) in a transaction
+    assert counter.count == 5
+    assert await DataModel.select().count() == 5
+
+
 async def test_save(schema):
     inst = DataModel(data="data")
     await inst.save()
@@ -109,6 +124,76 @@ async def test_bulk_update(schema):
         assert instance.data == "updated"
 
 
+@pytest.mark.parametrize("strategy", [None, "case"])
+async def test_bulk_update_strategies(schema, strategy):
+    await DataModel.insert_many([{"data": f"t{n}"} for n in range(3)])
+    instances = await DataModel.select().order_by(DataModel.id)
+
+    for instance in instances:
+        instance.data = f"updated-{instance.id}"
+
+    with count_queries() as counter:
+        assert await DataModel.bulk_update(instances, ["data"], strategy=strategy) == 3
+
+    assert counter.count == 1
+    async for instance in DataModel.select():
+        assert instance.data == f"updated-{instance.id}"
+
+    # Expressions fall back to CASE
+    instances[0].data = DataModel.data.concat("!")
+    assert await DataModel.bulk_update(instances[:1], ["data"], strategy=strategy) == 1
+    assert (await DataModel.get_by_id(instances[0].id)).data == f"updated-{instances[0].id}!"
+
+
+async def test_bulk_update_join(schema):
+    if DataModel._meta.database.update_strategy != "join":
+        pytest.skip("the joined update is supported by MySQL only")
+
+    await DataModel.insert_many([{"data": f"t{n}"} for n in range(3)])
+    instances = await DataModel.select().order_by(DataModel.id)
+    for instance in instances:
+        instance.data = f"joined-{instance.id}"
+
+    assert await DataModel.bulk_update(instances, ["data"], strategy="join") == 3
+    async for instance in DataModel.select():
+        assert instance.data == f"joined-{instance.id}"
+
+
+async def test_bulk_update_invalid_strategy(schema):
+    inst = await DataModel.create(data="data")
+    with pytest.raises(ValueError, match="Unknown update strategy"):
+        await DataModel.bulk_update([inst], ["data"], strategy="vals")
+
+    strategy = "values" if DataModel._meta.database.update_strategy == "join" else "join"
+    with pytest.raises(ValueError, match="is not supported"):
+        await DataModel.bulk_update([inst], ["data"], strategy=strategy)
+
+
+def test_bulk_update_sql():
+    class Model(peewee.Model):
+        name = peewee.CharField()
+
+    rows = [(1, "a"), (2, "b")]
+    with Model.bind_ctx(peewee.PostgresqlDatabase("tests")):
+        sql, params = update_from_values(Model, [Model.name], rows, "values").sql()
+        assert sql == (
+            'UPDATE "model" SET "name" = "v"."column2" '
+            "FROM (VALUES (CAST(%s AS INTEGER), CAST(%s AS VARCHAR)), "
+            '(CAST(%s AS INTEGER), CAST(%s AS VARCHAR))) AS "v" '
+            'WHERE ("model"."id" = "v"."column1")'
+        )
+        assert params == [1, "a", 2, "b"]
+
+    with Model.bind_ctx(peewee.MySQLDatabase("tests")):
+        sql, params = update_from_values(Model, [Model.name], rows, "join").query()
+        assert sql == (
+            "UPDATE `model` AS `t1` INNER JOIN "
+            "(SELECT %s AS `column1`, %s AS `column2` UNION ALL SELECT %s, %s) AS `v` "
+            "ON (`t1`.`id` = `v`.`column1`) SET `t1`.`name` = `v`.`column2`"
+        )
+        assert params == [1, "a", 2, "b"]
+
+
 async def test_delete(schema):
     inst = await DataModel.create(data="data")
     await DataModel.delete().where(DataModel.id == inst.id)
@@ -4,6 +4,9 @@ from typing import Any
 
 import peewee
 import pytest
+from playhouse.test_utils import count_queries
+
+from peewee_aio.results import KVCache, MemoryCache, query_tags
 
 from .conftest import DataModel
 
@@ -46,6 +49,149 @@ async def test_select_items(data):
     assert res == [t1, t2]
 
 
+async def test_stream(data):
+    res = [dm async for dm in DataModel.select().order_by(DataModel.id).stream(batch_size=2)]
+    assert res == data
+    assert isinstance(res[0], DataModel)
+
+
+async def test_columns_result(data):
+    res = await DataModel.select().order_by(DataModel.id).columns_result(numpy=False)
+    assert list(res["id"]) == [inst.id for inst in data]
+    assert list(res["data"]) == ["t0", "t1", "t2"]
+
+
+@pytest.mark.parametrize("temp_table", [False, True])
+async def test_exists_many(data, temp_table):
+    ids = [inst.id for inst in data]
+    missing = max(ids) + 100
+    with count_queries() as counter:
+        res = await DataModel.exists_many(
+            DataModel.id, [*ids, missing, ids[0]], batch_size=2, temp_table=temp_table
+        )
+
+    assert res == set(ids)
+    # 2 IN queries or a temporary table in a transaction: create, 2 inserts, select, drop
+    assert counter.count == (7 if temp_table else 2)
+
+    assert await DataModel.exists_many("data", ["t1", "t9"]) == {"t1"}
+    assert await DataModel.exists_many("data", []) == set()
+
+
+async def test_exists_many_errors(data, monkeypatch):
+    from peewee_aio.model import AIOModelSelect
+
+    async def scalars(*args, **kwargs):
+        raise RuntimeError("scalars")
+
+    # The original error is raised (the temporary table is dropped with the transaction)
+    with monkeypatch.context() as patch:
+        patch.setattr(AIOModelSelect, "scalars", scalars)
+        with pytest.raises(RuntimeError, match="scalars"):
+            await DataModel.exists_many(DataModel.id, [data[0].id], temp_table=True)
+
+    assert await DataModel.exists_many(DataModel.id, [data[0].id], temp_table=True) == {data[0].id}
+
+
+@pytest.mark.parametrize("cache", [MemoryCache, KVCache])
+async def test_cached(manager, data, cache, monkeypatch):
+    monkeypatch.setattr(manager, "result_cache", cache())
+    qs = DataModel.select().order_by(DataModel.id).cached(ttl=30)
+    assert query_tags(qs) == {"datamodel"}
+
+    with count_queries() as counter:
+        assert await qs == data
+        assert await qs == data
+        assert await qs.dicts() == await qs.dicts()
+        assert await qs.get() == data[0]
+        assert await qs.get() == data[0]
+        assert await qs.scalars() == await qs.scalars()
+        assert await qs.where(DataModel.id == 0).first() is None
+        assert await qs.where(DataModel.id == 0).first() is None
+
+        # Not cached queries
+        assert await DataModel.select().order_by(DataModel.id) == data
+
+    # Rows are cached by SQL, so dicts/tuples share the results
+    assert counter.count == 4
+    assert manager.result_cache.hits == 7
+    assert manager.result_cache.misses == 3
+
+    # Writes invalidate the cached results
+    await DataModel.update(data="updated").where(DataModel.id == data[0].id)
+    inst = await qs.get()
+    assert inst.data == "updated"
+
+    inst.data = "saved"
+    await inst.save()
+    assert (await qs.get()).data == "saved"
+
+    await DataModel.bulk_update([inst], ["data"], strategy="case")
+    await DataModel.delete().where(DataModel.id == inst.id)
+    assert await qs == data[1:]
+
+    # Writes in transactions invalidate the results after commit
+    cache = manager.result_cache
+    stamp = await cache.stamp(["datamodel"])
+    async with manager.transaction():
+        await DataModel.update(data="trans").where(DataModel.id == data[1].id)
+        assert await cache.stamp(["datamodel"]) == stamp
+
+    assert await cache.stamp(["datamodel"]) != stamp
+    assert (await qs.get()).data == "trans"
+
+    inst = await qs.get()
+    inst.data = "bulk"
+    stamp = await cache.stamp(["datamodel"])
+    async with manager.transaction():
+        await DataModel.bulk_update([inst], ["data"])
+        assert await cache.stamp(["datamodel"]) == stamp
+
+    assert await cache.stamp(["datamodel"]) != stamp
+    assert (await qs.get()).data == "bulk"
+
+    # Rolled back writes keep the results
+    stamp = await cache.stamp(["datamodel"])
+    with pytest.raises(RuntimeError):
+        async with manager.transaction():
+            await DataModel.update(data="rollback").where(DataModel.id == data[1].id)
+            raise RuntimeError
+
+    assert await cache.stamp(["datamodel"]) == stamp
+    assert not manager.pending_tags
+
+
+async def test_seek(schema):
+    await DataModel.insert_many([{"data": f"t{n % 3}"} for n in range(7)])
+    rows = await DataModel.select().order_by(DataModel.data, DataModel.id.desc())
+
+    qs = DataModel.select()
+    page = await qs.seek(by=(DataModel.data, DataModel.id.desc()), size=3)
+    assert page == rows[:3]
+
+    # Mixed directions
+    page = await qs.seek(page[-1], by=(DataModel.data, DataModel.id.desc()), size=3)
+    assert page == rows[3:6]
+
+    # Row values
+    page = await qs.seek((rows[0].data, rows[0].id), by=(DataModel.data, DataModel.id), size=2)
+    assert [dm.data for dm in page] == ["t1", "t1"]
+
+    page = await qs.dicts().seek({"id": 3}, by=(DataModel.id.desc(),), size=5)
+    assert [row["id"] for row in page] == [2, 1]
+
+    res = [dm async for dm in qs.seek_iter(by=(DataModel.data, DataModel.id.desc()), size=2)]
+    assert res == rows
+
+    res = [dm async for dm in qs.seek_iter(by=(DataModel.data.desc(), DataModel.id.desc()))]
+    assert res == await DataModel.select().order_by(DataModel.data.desc(), DataModel.id.desc())
+
+    # Tuples with more columns than the ordering ones
+    qs = DataModel.select(DataModel.data, DataModel.id).tuples()
+    res = [row async for row in qs.seek_iter(by=(DataModel.id,), size=3)]
+    assert res == [(dm.data, dm.id) for dm in sorted(rows, key=lambda dm: dm.id)]
+
+
 async def test_get_or_create(schema):
     from .conftest import DataModel  # type: ignore[]
 
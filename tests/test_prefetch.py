@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import os
+import tempfile
+
+import peewee as pw
+import pytest
+
+from peewee_aio import AIOModel, Manager, fields
+
+
+@pytest.fixture
+async def file_manager(aiolib):
+    if aiolib[0] != "asyncio":
+        pytest.skip("aiosqlite supports only asyncio")
+
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        db_path = f.name
+
+    manager = Manager(f"aiosqlite:///{db_path}")
+
+    @manager.register
+    class Author(AIOModel):
+        id = pw.AutoField()
+        name = pw.CharField()
+
+    @manager.register
+    class Book(AIOModel):
+        id = pw.AutoField()
+        title = pw.CharField()
+        author = fields.ForeignKeyField(Author, backref="books")
+
+    @manager.register
+    class Review(AIOModel):
+        id = pw.AutoField()
+        body = pw.CharField()
+        book = fields.ForeignKeyField(Book, backref="reviews")
+
+    @manager.register
+    class Award(AIOModel):
+        id = pw.AutoField()
+        name = pw.CharField()
+        author = fields.ForeignKeyField(Author, backref="awards")
+
+    async with manager, manager.connection():
+        await manager.create_tables()
+        for n in range(3):
+            author = await Author.create(name=f"author{n}")
+            await Award.create(name=f"award{n}", author=author)
+            for m in range(2):
+                book = await Book.create(title=f"book{n}{m}", author=author)
+                await Review.create(body=f"review{n}{m}", book=book)
+
+        yield manager
+        await manager.drop_tables()
+
+    os.unlink(db_path)  # noqa: PTH108
+
+
+def dump(authors):
+    return [
+        (
+            author.name,
+            [award.name for award in author.awards],
+            [(book.title, [review.body for review in book.reviews]) for book in author.books],
+        )
+        for author in authors
+    ]
+
+
+async def test_prefetch_concurrency(file_manager, monkeypatch):
+    Author, Award, Book, Review = list(file_manager)  # noqa: N806
+    query = Author.select().order_by(Author.id)
+
+    expected = dump(await file_manager.prefetch(query, Book, Review, Award))
+    assert expected[0] == (
+        "author0",
+        ["award0"],
+        [("book00", ["review00"]), ("book01", ["review01"])],
+    )
+
+    connection = file_manager.connection
+    created = []
+
+    def spy(*, create=True, **params):
+        created.append(create)
+        return connection(create=create, **params)
+
+    monkeypatch.setattr(file_manager, "connection", spy)
+
+    res = await query.prefetch(Book, Review, Award, concurrency=3)
+    assert dump(res) == expected
+    assert created.count(True) == 4
+
+    created.clear()
+
+    # Transactions run the subqueries sequentially on the same connection
+    async with file_manager.transaction():
+        await Award.create(name="award", author=res[0])
+        res = await query.prefetch(Book, Review, Award, concurrency=3)
+        assert dump(res)[0][1] == ["award0", "award"]
+        assert True not in created
+
+
+async def test_gather(file_manager, monkeypatch):
+    Author, Award, Book, Review = list(file_manager)  # noqa: N806
+    queries = [
+        Author.select().order_by(Author.id),
+        Book.select().where(Book.title == "book00"),
+        Review.select(pw.fn.COUNT(Review.id)).tuples(),
+        Award.select().order_by(Award.id).dicts(),
+    ]
+    expected = [await file_manager.run(query) for query in queries]
+
+    connection = file_manager.connection
+    created = []
+
+    def spy(*, create=True, **params):
+        created.append(create)
+        return connection(create=create, **params)
+
+    monkeypatch.setattr(file_manager, "connection", spy)
+
+    assert file_manager.pool_size is None
+    res = await file_manager.gather(*queries, max_concurrency=2)
+    assert res == expected
+    assert created.count(True) == 4
+
+    created.clear()
+    async with file_manager.transaction():
+        assert await file_manager.gather(*queries) == expected
+        assert True not in created
+
+
+async def test_prefetch_iter(file_manager):
+    Author, Award, Book, Review = list(file_manager)  # noqa: N806
+    expected = dump(
+        await file_manager.prefetch(Author.select().order_by(Author.id), Book, Review, Award)
+    )
+
+    # Paginated by the primary key
+    res = [
+        author async for author in Author.select().prefetch_iter(Book, Review, Award, chunk_size=2)
+    ]
+    assert dump(res) == expected
+
+    # Paginated with limit/offset
+    query = Author.select().order_by(Author.name.desc())
+    res = [author async for author in query.prefetch_iter(Book, Review, Award, chunk_size=2)]
+    assert dump(res) == expected[::-1]
+
+    query = Author.select().order_by(Author.id).offset(1).limit(1)
+    res = [author async for author in query.prefetch_iter(Book, chunk_size=2)]
+    assert [(author.name, len(author.books)) for author in res] == [("author1", 2)]
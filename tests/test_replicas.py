@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import tempfile
 
@@ -7,6 +8,7 @@ import peewee as pw
 import pytest
 
 from peewee_aio import AIOModel, Manager
+from peewee_aio.replicas import ReplicaRouter, ReplicaState, is_read
 
 
 @pytest.fixture
@@ -51,3 +53,120 @@ async def test_replica_async_for(replica_manager):
         assert len(users) == 2
         assert users[0].name == "test1"
         assert users[1].name == "test2"
+
+
+async def test_read_routing(replica_manager, monkeypatch):
+    manager, TestUser = replica_manager  # noqa: N806
+    router = ReplicaRouter(manager, window=10)
+    monkeypatch.setattr(manager, "router", router)
+    (replica,) = router.replicas
+
+    await TestUser.create(name="test")
+
+    # Read your writes
+    assert await TestUser.select().count() == 1
+    assert replica.queries == 0
+
+    monkeypatch.setattr(router, "window", 0)
+    assert await TestUser.select().count() == 1
+    assert [user.name async for user in TestUser.select()] == ["test"]
+    assert await manager.fetchval("SELECT COUNT(*) FROM testuser") == 1
+    assert replica.queries == 3
+    assert replica.latency is not None
+
+    # Locking reads and transactions use the primary
+    async with manager.transaction():
+        assert await TestUser.select().get()
+    assert replica.queries == 3
+    assert not is_read(TestUser.select().for_update())
+
+    # Explicit replica connections are kept
+    async with manager.replica():
+        assert await TestUser.select().get()
+    assert replica.queries == 3
+
+    # Least latency
+    router = ReplicaRouter(manager, policy="least_latency")
+    router.replicas = [ReplicaState(replica.backend), ReplicaState(replica.backend)]
+    router.replicas[0].latency = 0.5
+    assert router.choose() is router.replicas[1]
+
+    with pytest.raises(ValueError, match="Unknown routing policy"):
+        ReplicaRouter(manager, policy="random")
+
+    with pytest.raises(ValueError, match="requires replicas"):
+        Manager("aiosqlite:///:memory:", read_routing="round_robin")
+
+
+async def test_replicas_health(replica_manager, monkeypatch, tmp_path):
+    manager, TestUser = replica_manager  # noqa: N806
+    # The replica is the primary's file
+    manager = Manager(
+        manager.url,
+        replicas=[manager.url, f"aiosqlite:///{tmp_path}/missing/db.sqlite"],
+        read_routing="round_robin",
+        read_your_writes=0,
+        replica_max_lag=1,
+    )
+    manager.register(TestUser)
+    replica, broken = manager.replicas
+
+    async with manager, manager.connection():
+        await TestUser.create(name="test")
+
+        await manager.check_replicas()
+        assert replica.healthy
+        assert replica.latency is not None
+        assert not broken.healthy
+        assert broken.error
+        assert [metrics["healthy"] for metrics in manager.replicas_metrics()] == [True, False]
+
+        # Unhealthy replicas are skipped
+        for _ in range(3):
+            assert await TestUser.select().count() == 1
+        assert replica.queries == 3
+        assert broken.queries == 0
+
+        # Failed connections fail over to the primary
+        broken.healthy = True
+        replica.healthy = False
+        assert await TestUser.select().count() == 1
+        assert not broken.healthy
+        assert broken.errors == 2
+
+        # No healthy replicas
+        assert await TestUser.select().count() == 1
+        assert replica.queries == 3
+        async with manager.replica() as conn:
+            assert conn.backend is manager.backend
+
+        # Lagging replicas
+        async def lagging(_):
+            return 10.0
+
+        monkeypatch.setattr(ReplicaState, "probe", lagging)
+        await manager.check_replicas()
+        assert not replica.healthy
+        assert replica.lag == 10
+        assert replica.error == "replication lag 10.000s"
+
+        # Slow replicas
+        async def slow(_):
+            await asyncio.sleep(1)
+
+        monkeypatch.setattr(ReplicaState, "probe", slow)
+        await manager.check_replicas(timeout=0.01)
+        assert not replica.healthy
+
+        # Background monitor
+        monkeypatch.undo()
+        async with manager.monitor_replicas(interval=0.01) as replicas:
+            assert replicas[0].healthy
+
+            replica.healthy = False
+            for _ in range(100):
+                if replica.healthy:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert replica.healthy
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import os
+import tempfile
+
+import peewee as pw
+import pytest
+
+from peewee_aio import AIOModel, Manager, fields
+from peewee_aio.sharding import ShardedManager, key_values
+
+
+@pytest.fixture
+async def sharded(aiolib):
+    if aiolib[0] != "asyncio":
+        pytest.skip("aiosqlite supports only asyncio")
+
+    paths = []
+    for _ in range(2):
+        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+            paths.append(f.name)
+
+    sharded = ShardedManager(
+        {n: Manager(f"aiosqlite:///{path}") for n, path in enumerate(paths)},
+        key=lambda value: value % 2,
+    )
+
+    @sharded.register
+    class Account(AIOModel):
+        id = pw.IntegerField(primary_key=True)
+        name = pw.CharField()
+
+    @sharded.register
+    class Order(AIOModel):
+        id = pw.AutoField()
+        total = pw.IntegerField()
+        note = pw.CharField(null=True)
+        account = fields.ForeignKeyField(Account, backref="orders")
+
+        class Meta:
+            shard_key = "account"
+
+    async with sharded:
+        await sharded.create_tables()
+        yield sharded
+        await sharded.drop_tables()
+
+    for path in paths:
+        os.unlink(path)  # noqa: PTH108
+
+
+async def test_sharding(sharded):
+    Account, Order = list(sharded)
+    shard0, shard1 = sharded.shards.values()
+
+    for n in range(1, 5):
+        account = await Account.create(id=n, name=f"account{n}")
+        await Order.create(account=account, total=n * 10)
+        await Order.create(account=account, total=n * 10 + 5)
+
+    assert await sharded.on_shard(shard0, shard0.count, Account.select()) == 2
+    assert await sharded.on_shard(shard1, shard1.count, Account.select()) == 2
+    assert await sharded.on_shard(shard1, shard1.fetchval, Order.select(pw.fn.SUM(Order.total))) == 90
+
+    # Routed by the shard key
+    account = await Account.get_by_id(3)
+    assert account.name == "account3"
+    assert [route[0] for route in sharded.route(Account.select().where(Account.id == 3))] == [
+        shard1
+    ]
+    orders = await account.orders.order_by(Order.total)
+    assert [order.total for order in orders] == [30, 35]
+
+    account.name = "updated"
+    await account.save()
+    assert (await Account.get(Account.id == 3)).name == "updated"
+
+    # Fan out
+    accounts = await Account.select().order_by(Account.id)
+    assert [account.id for account in accounts] == [1, 2, 3, 4]
+
+    totals = await Order.select(Order.total).order_by(Order.total.desc()).limit(3).offset(1)
+    assert [order.total for order in totals] == [40, 35, 30]
+
+    rows = await Order.select(Order.account, Order.total).order_by(
+        Order.account.desc(), Order.total
+    ).tuples()
+    assert rows == [(4, 40), (4, 45), (3, 30), (3, 35), (2, 20), (2, 25), (1, 10), (1, 15)]
+
+    # NULLs are ordered as the database does (the smallest values on SQLite)
+    await Order.update(note="b").where(Order.total.in_([15, 20]))
+    await Order.update(note="a").where(Order.total == 35)
+    notes = Order.select(Order.note, Order.total)
+    rows = await notes.order_by(Order.note, Order.total).tuples()
+    assert rows == [
+        (None, 10),
+        (None, 25),
+        (None, 30),
+        (None, 40),
+        (None, 45),
+        ("a", 35),
+        ("b", 15),
+        ("b", 20),
+    ]
+    rows = await notes.order_by(Order.note.desc(), Order.total.desc()).limit(4).tuples()
+    assert rows == [("b", 20), ("b", 15), ("a", 35), (None, 45)]
+    rows = await notes.order_by(Order.note.asc(nulls="last"), Order.total).limit(4).tuples()
+    assert rows == [("a", 35), ("b", 15), ("b", 20), (None, 10)]
+
+    assert [account.id async for account in Account.select().order_by(Account.id.desc())] == [
+        4,
+        3,
+        2,
+        1,
+    ]
+
+    accounts = await Account.select().order_by(Account.id).prefetch(Order)
+    assert [len(account.orders) for account in accounts] == [2, 2, 2, 2]
+
+    assert await Order.select().count() == 8
+    assert await Order.select().limit(5).count() == 5
+    assert await Order.select().where(Order.account.in_([1, 3])).count() == 4
+    assert (await Order.select().where(Order.total > 30).order_by(Order.total).get()).total == 35
+    assert await Account.get_or_none(Account.name == "missing") is None
+
+    # Conditions on the shard key
+    assert key_values((Order.account == 1) & (Order.total > 0), Order.account) == {1}
+    assert key_values((Order.account == 1) | (Order.account.in_([2, 3])), Order.account) == {
+        1,
+        2,
+        3,
+    }
+    assert key_values((Order.account == 1) | (Order.total > 0), Order.account) is None
+
+    # Inserts are split by shards
+    await Account.insert_many([{"id": 5, "name": "account5"}, {"id": 6, "name": "account6"}])
+    assert await sharded.on_shard(shard0, shard0.count, Account.select()) == 3
+    assert await sharded.on_shard(shard1, shard1.count, Account.select()) == 3
+
+    with pytest.raises(ValueError, match="shard key is required"):
+        await Order.create(total=1)
+
+    # Updates and deletes
+    assert await Order.update(total=Order.total + 1).where(Order.account == 2) == 2
+    assert await Order.delete().where(Order.total < 20) == 2
+    assert await Order.select().count() == 6
+
+    account = await Account.get_by_id(4)
+    await account.delete_instance(recursive=True)
+    assert await Account.select().count() == 5
+    assert await Order.select().count() == 4
+
+
+async def test_sharding_transactions(sharded):
+    Account, Order = list(sharded)
+    shard0, shard1 = sharded.shards.values()
+
+    account, created = await Account.get_or_create(id=1, defaults={"name": "account1"})
+    assert created
+    assert account.name == "account1"
+    account, created = await Account.get_or_create(id=1, defaults={"name": "other"})
+    assert not created
+    assert account.name == "account1"
+
+    # Several batches in a transaction per shard
+    accounts = [Account(id=n, name=f"account{n}") for n in range(2, 7)]
+    await Account.bulk_create(accounts, batch_size=2)
+    assert await sharded.on_shard(shard0, shard0.count, Account.select()) == 3
+    assert await sharded.on_shard(shard1, shard1.count, Account.select()) == 3
+
+    for strategy in (None, "case"):
+        for account in accounts:
+            account.name = f"{strategy}{account.id}"
+        assert await Account.bulk_update(accounts, ["name"], batch_size=2, strategy=strategy) == 5
+        assert await Account.select(Account.name).order_by(Account.id).scalars() == [
+            "account1",
+            *(f"{strategy}{n}" for n in range(2, 7)),
+        ]
+
+    assert await Account.exists_many(Account.id, [1, 4, 5, 9], temp_table=True) == {1, 4, 5}
+    assert await Account.exists_many(Account.id, [1, 4, 5, 9]) == {1, 4, 5}
+
+    # The transactions are rolled back on every shard
+    with pytest.raises(RuntimeError):
+        async with sharded.transaction():
+            await Account.create(id=7, name="account7")
+            await Account.create(id=8, name="account8")
+            assert await Account.select().count() == 8
+            raise RuntimeError
+
+    assert await Account.select().count() == 6
+
+    async with sharded.session() as session:
+        account = await Account.get_by_id(2)
+        assert await Account.get_by_id(2) is account
+        account.name = "session"
+        other = await Account.get_by_id(3)
+        other.name = "session"
+        assert session.dirty == [account, other]
+
+    assert await Account.select().where(Account.name == "session").count() == 2
+
+
+async def test_sharding_streams(sharded):
+    Account, Order = list(sharded)
+    await Account.insert_many([{"id": n, "name": f"account{n}"} for n in range(1, 7)])
+    await Order.insert_many(
+        [{"account": n, "total": n * 10 + m} for n in range(1, 7) for m in range(2)]
+    )
+
+    qs = Order.select().order_by(Order.total.desc())
+    assert [order.total async for order in qs.stream(batch_size=2)] == [
+        order.total for order in await qs
+    ]
+    assert [order.total async for order in qs.limit(3).offset(2).stream(batch_size=2)] == [
+        51,
+        50,
+        41,
+    ]
+    assert sorted([order.total async for order in Order.select().stream()]) == sorted(
+        order.total for order in await qs
+    )
+    assert [account.id async for account in Account.select().where(Account.id == 3).stream()] == [
+        3
+    ]
+
+    accounts = [
+        account async for account in Account.select().prefetch_iter(Order, chunk_size=4)
+    ]
+    assert [account.id for account in accounts] == [1, 2, 3, 4, 5, 6]
+    assert [len(account.orders) for account in accounts] == [2] * 6
+
+    orders = [order async for order in Order.select().prefetch_iter(chunk_size=5)]
+    assert len(orders) == 12
+
+    res = await Account.select().order_by(Account.id.desc()).columns_result(numpy=False)
+    assert list(res["id"]) == [6, 5, 4, 3, 2, 1]
+    res = await Account.select().where(Account.id == 2).columns_result(numpy=False)
+    assert list(res["name"]) == ["account2"]